@@ -1,22 +1,44 @@
-"""Aina library - Core functionality for analysis set management."""
+"""Aina library - Core functionality for analysis set management.
 
-from .database import Database
-from .discovery import discover_repos
-from .git_staleness import get_repo_staleness_info, format_staleness_warning
-from .git_stats import get_file_stats, get_file_stats_with_follow, get_coupling_data, get_growth_data, get_file_growth, get_repo_growth_totals
-from .analysis import (
-    run_cloc,
-    build_directory_tree,
-    tree_to_schema,
-    analyze_repos,
-    generate_analysis_index,
-)
-from .cli import cmd_add, cmd_list, cmd_remove, cmd_analyze
-from .server import create_request_handler, cmd_show
+Public names are imported from their submodules on first access, so a CLI
+command only pays for the modules it uses (the web server stack in
+particular is not loaded by add/list/remove/analyze).
+"""
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    'Database': 'database',
+    'FileStatsCache': 'database',
+    'discover_repos': 'discovery',
+    'get_repo_staleness_info': 'git_staleness',
+    'format_staleness_warning': 'git_staleness',
+    'get_file_stats': 'git_stats',
+    'get_file_stats_cached': 'git_stats',
+    'get_head_commit': 'git_stats',
+    'get_file_stats_with_follow': 'git_stats',
+    'get_coupling_data': 'git_stats',
+    'get_coupling_data_cached': 'git_stats',
+    'get_growth_data': 'git_stats',
+    'get_file_growth': 'git_stats',
+    'get_repo_growth_totals': 'git_stats',
+    'run_cloc': 'analysis',
+    'build_directory_tree': 'analysis',
+    'tree_to_schema': 'analysis',
+    'analyze_repos': 'analysis',
+    'generate_analysis_index': 'analysis',
+    'cmd_add': 'cli',
+    'cmd_list': 'cli',
+    'cmd_remove': 'cli',
+    'cmd_analyze': 'cli',
+    'create_request_handler': 'server',
+    'cmd_show': 'server',
+}
 
 __all__ = [
     # Database
     'Database',
+    'FileStatsCache',
     # Discovery
     'discover_repos',
     # Git staleness
@@ -24,8 +46,11 @@ __all__ = [
     'format_staleness_warning',
     # Git stats
     'get_file_stats',
+    'get_file_stats_cached',
+    'get_head_commit',
     'get_file_stats_with_follow',
     'get_coupling_data',
+    'get_coupling_data_cached',
     'get_growth_data',
     'get_file_growth',
     'get_repo_growth_totals',
@@ -44,3 +69,17 @@ __all__ = [
     'create_request_handler',
     'cmd_show',
 ]
+
+
+def __getattr__(name):
+    """Import the submodule defining a public name on first access."""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
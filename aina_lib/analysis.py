@@ -1,13 +1,43 @@
 """Core analysis functions."""
+import functools
+import heapq
+import os
 import subprocess
 import json
+import sqlite3
+import threading
+import time
+from collections import Counter
 from pathlib import Path
-from datetime import datetime, timezone
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from operator import itemgetter
 
 from .discovery import discover_repos
+from .file_utils import get_analysis_dir, read_json, read_json_fields, write_json
 from .git_staleness import get_repo_staleness_info, format_staleness_warning
-from .git_stats import get_file_stats, get_coupling_data, get_growth_data
+from .git_stats import (
+    get_file_stats, get_file_stats_cached, get_coupling_data, get_coupling_data_cached, get_growth_data
+)
+
+# Per-file index entries keyed by name, with the (mtime_ns, size) they were
+# read at. No .json suffix, so the analysis glob never picks it up.
+_INDEX_CACHE_NAME = '.index_cache'
+
+# Commit counts of a file without git history (e.g. untracked). Shared by
+# every such file node rather than built per file; never mutated.
+_ZERO_COMMITS = {'last_3_months': 0, 'last_year': 0, 'last_commit_date': None}
+
+# Languages by file extension for files cloc timed out on and wc -l counted
+_FALLBACK_LANGUAGES = {
+    'ts': 'TypeScript', 'tsx': 'TypeScript',
+    'js': 'JavaScript', 'jsx': 'JavaScript',
+    'py': 'Python', 'java': 'Java',
+    'go': 'Go', 'rs': 'Rust', 'rb': 'Ruby',
+}
+
+
+def _utc_now_iso():
+    """Return the current UTC time as an ISO 8601 string like 2025-01-01T12:00:00Z."""
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
 
 
 def run_cloc(repo_path, on_progress=None):
@@ -29,41 +59,37 @@ def run_cloc(repo_path, on_progress=None):
             on_progress(msg)
 
     try:
+        # Capture raw bytes: json.loads parses them directly, so the (possibly
+        # multi-megabyte) output is never decoded into an intermediate str.
+        # cloc never reads stdin, and the C locale spares Perl its locale setup.
         result = subprocess.run(
             ['cloc', '--vcs=git', '--json', '--by-file', str(repo_path)],
+            stdin=subprocess.DEVNULL,
             capture_output=True,
-            text=True,
+            env={**os.environ, 'LC_ALL': 'C'},
             check=False  # Don't fail on non-zero exit (e.g., timeout on one file)
         )
-
         # Parse JSON even if cloc had partial errors
-        if not result.stdout.strip():
-            raise RuntimeError(f"cloc produced no output: {result.stderr}")
+        if not result.stdout or result.stdout.isspace():
+            stderr = result.stderr.decode('utf-8', errors='replace')
+            raise RuntimeError(f"cloc produced no output: {stderr}")
 
-        # cloc may append warning text after JSON on timeout - extract just the JSON
-        stdout = result.stdout.strip()
         try:
-            cloc_data = json.loads(stdout)
+            cloc_data = json.loads(result.stdout)
         except json.JSONDecodeError:
-            # Find end of JSON by matching braces
-            brace_count = 0
-            json_end = 0
-            for i, char in enumerate(stdout):
-                if char == '{':
-                    brace_count += 1
-                elif char == '}':
-                    brace_count -= 1
-                    if brace_count == 0:
-                        json_end = i + 1
-                        break
-            if json_end > 0:
-                cloc_data = json.loads(stdout[:json_end])
-            else:
+            # cloc may append warning text after JSON on timeout - decode just the
+            # leading JSON document and ignore the trailing text
+            stdout = result.stdout.decode('utf-8', errors='replace').lstrip()
+            try:
+                cloc_data, _ = json.JSONDecoder().raw_decode(stdout)
+            except json.JSONDecodeError:
                 raise RuntimeError(f"cloc produced invalid JSON: {stdout[:200]}")
 
-        # Check stderr for timeout errors and fall back to wc -l
-        if result.stderr and 'exceeded timeout' in result.stderr:
-            for line in result.stderr.splitlines():
+        # Check stderr for timeout errors and fall back to wc -l. stderr is
+        # only decoded when there is something to look for in it.
+        if b'exceeded timeout' in result.stderr:
+            stderr = result.stderr.decode('utf-8', errors='replace')
+            for line in stderr.splitlines():
                 if 'exceeded timeout:' in line:
                     # Extract file path from error message
                     file_path = line.split('exceeded timeout:')[-1].strip()
@@ -78,13 +104,7 @@ def run_cloc(repo_path, on_progress=None):
                             line_count = int(wc_result.stdout.strip().split()[0])
                             # Determine language from extension
                             ext = Path(file_path).suffix.lstrip('.')
-                            lang_map = {
-                                'ts': 'TypeScript', 'tsx': 'TypeScript',
-                                'js': 'JavaScript', 'jsx': 'JavaScript',
-                                'py': 'Python', 'java': 'Java',
-                                'go': 'Go', 'rs': 'Rust', 'rb': 'Ruby',
-                            }
-                            language = lang_map.get(ext, 'Unknown')
+                            language = _FALLBACK_LANGUAGES.get(ext, 'Unknown')
                             # Add to cloc data
                             cloc_data[file_path] = {
                                 'blank': 0,
@@ -104,44 +124,88 @@ def run_cloc(repo_path, on_progress=None):
         raise RuntimeError(f"cloc produced invalid JSON: {e}")
 
 
-def build_directory_tree(files, base_path):
+def _path_suffix(filename):
+    """Return the extension of a file name, with the same rules as Path.suffix."""
+    i = filename.rfind('.')
+    if 0 < i < len(filename) - 1:
+        return filename[i:]
+    return ''
+
+
+def build_directory_tree(files, base_path, languages=None):
     """Build hierarchical directory tree from flat file list.
 
     Args:
         files: Dict of {filepath: {blank, comment, code, language}}
         base_path: Base path to make all paths relative to
+        languages: Optional Counter; lines of code per language of the files
+            in the tree are added to it while the tree is built
 
     Returns:
-        dict: Tree structure with nested directories and files
+        dict: Tree structure with nested directories (``_dirs``) and files
+        (``_files``), both in name order. File entries are already schema file nodes; their ``path``
+        is repo-relative until tree_to_schema prefixes it.
     """
     base = Path(base_path)
     tree = {'_dirs': {}, '_files': []}
 
+    # cloc keys normally start with the base path exactly as given, so plain
+    # string slicing replaces Path.relative_to; any other spelling of the
+    # path (doubled or ./ separators) goes through Path.
+    prefix = os.path.join(str(base), '')
+
+    entries = []
     for filepath, stats in files.items():
-        path = Path(filepath)
+        parts = None
+        if filepath.startswith(prefix):
+            rel = filepath[len(prefix):]
+            parts = rel.split(os.sep)
+            if '' in parts or '.' in parts:
+                parts = None
+
+        if parts is None:
+            try:
+                rel_path = Path(filepath).relative_to(base)
+            except ValueError:
+                continue
+            parts = list(rel_path.parts)
+            rel = str(rel_path)
 
-        try:
-            rel_path = path.relative_to(base)
-        except ValueError:
-            continue
+        entries.append((parts, rel, stats))
 
-        parts = rel_path.parts
-        filename = parts[-1]
-        current = tree
+    # Sorting once by path components makes every directory receive its
+    # subdirectories and files already in name order.
+    entries.sort(key=itemgetter(0))
+
+    # Directory path -> tree node, so only the first file in a directory walks
+    # (and creates) the nodes leading to it; every later one is one lookup.
+    dir_cache = {'': tree}
 
-        for part in parts[:-1]:
-            if part not in current['_dirs']:
-                current['_dirs'][part] = {'_dirs': {}, '_files': []}
-            current = current['_dirs'][part]
+    for parts, rel, stats in entries:
+        filename = parts[-1]
+        dir_key = rel[:-len(filename) - 1] if len(parts) > 1 else ''
+        current = dir_cache.get(dir_key)
+
+        if current is None:
+            current = tree
+            for part in parts[:-1]:
+                if part not in current['_dirs']:
+                    current['_dirs'][part] = {'_dirs': {}, '_files': []}
+                current = current['_dirs'][part]
+            dir_cache[dir_key] = current
+
+        code = stats.get('code', 0)
+        language = stats.get('language', 'Unknown')
+        if languages is not None:
+            languages[language] += code
 
         current['_files'].append({
             'name': filename,
-            'path': str(rel_path),
-            'value': stats.get('code', 0),
-            'language': stats.get('language', 'Unknown'),
-            'extension': path.suffix,
-            'blank': stats.get('blank', 0),
-            'comment': stats.get('comment', 0)
+            'type': 'file',
+            'path': rel,
+            'value': code,
+            'language': language,
+            'extension': _path_suffix(filename)
         })
 
     return tree
@@ -157,6 +221,8 @@ def apply_file_stats(file_node, stats):
         file_node: The schema file node to enrich (mutated in place).
         stats: Per-path stats dict (may carry ``commits_3m``/``commits_1y``/
             ``last_commit_date``, ``contributors``, and/or ``growth``), or falsy.
+            Without stats, ``commits`` is a dict shared by all such nodes and
+            must not be modified.
     """
     if stats:
         file_node['commits'] = {
@@ -169,11 +235,7 @@ def apply_file_stats(file_node, stats):
         if 'growth' in stats:
             file_node['growth'] = stats['growth']
     else:
-        file_node['commits'] = {
-            'last_3_months': 0,
-            'last_year': 0,
-            'last_commit_date': None
-        }
+        file_node['commits'] = _ZERO_COMMITS
     return file_node
 
 
@@ -189,7 +251,8 @@ def _insert_deleted_node(repo_node, path_prefix, rel_path, growth):
     its growth rolls up into every ancestor folder. Paths are built like surviving nodes
     (``path_prefix`` + ``/``-joined parts) so frontend path-based exclusion applies equally.
     """
-    parts = Path(rel_path).parts
+    # git paths are always '/'-separated, so a split does what Path.parts did
+    parts = [part for part in rel_path.split('/') if part]
     if not parts:
         return
 
@@ -223,6 +286,13 @@ def _insert_deleted_node(repo_node, path_prefix, rel_path, growth):
 def tree_to_schema(tree, name, path_prefix='', git_stats=None):
     """Convert internal tree structure to JSON schema format.
 
+    File nodes built by build_directory_tree are reused rather than copied:
+    their ``path`` is rewritten in place to the prefixed schema path, so a
+    tree can only be converted once.
+
+    Children keep the order build_directory_tree produced (already sorted),
+    so no sorting happens here.
+
     Args:
         tree: Internal tree structure from build_directory_tree
         name: Name of this node
@@ -240,126 +310,173 @@ def tree_to_schema(tree, name, path_prefix='', git_stats=None):
     if not has_dirs and not has_files:
         return None
 
-    children = []
-
-    if has_dirs:
-        for dirname, subtree in sorted(tree['_dirs'].items()):
-            child = tree_to_schema(subtree, dirname, node_path, git_stats)
-            if child:
-                children.append(child)
-
-    if has_files:
-        for file in sorted(tree['_files'], key=lambda f: f['name']):
-            file_path = f"{node_path}/{file['name']}"
-            file_node = {
-                'name': file['name'],
-                'type': 'file',
-                'path': file_path,
-                'value': file['value'],
-                'language': file['language'],
-                'extension': file['extension']
-            }
-            if git_stats is not None:
-                stats = git_stats.get(file['path'])
-                apply_file_stats(file_node, stats)
-            children.append(file_node)
-
     node = {
         'name': name,
         'type': 'directory',
         'path': node_path,
-        'children': children
+        'children': _schema_children(tree, node_path, git_stats)
     }
 
     return node
 
 
-def check_staleness(repos):
+def _schema_children(tree, node_path, git_stats, growth=None):
+    """Convert the subdirectories and files below one tree level to schema nodes.
+
+    The subtree is walked with an explicit stack rather than by recursing
+    into tree_to_schema per directory. Each directory node is created and
+    appended to its parent when the parent is visited, so children keep
+    their order (directories first) whatever order the stack pops them in.
+
+    Args:
+        tree: Internal tree structure from build_directory_tree
+        node_path: Schema path of the parent node ('' for a root repository,
+            whose children are not prefixed)
+        git_stats: Optional dict of git statistics keyed by file path
+        growth: Optional per-file growth keyed by file path; merged into
+            git_stats for the files in the tree as they are visited
+
+    Returns:
+        list: Child nodes, directories first
+    """
+    children = []
+    stack = [(tree, node_path, children)]
+
+    while stack:
+        level, level_path, level_children = stack.pop()
+
+        for dirname, subtree in level['_dirs'].items():
+            if not subtree['_dirs'] and not subtree['_files']:
+                continue
+            dir_path = f"{level_path}/{dirname}" if level_path else dirname
+            dir_node = {'name': dirname, 'type': 'directory', 'path': dir_path, 'children': []}
+            level_children.append(dir_node)
+            stack.append((subtree, dir_path, dir_node['children']))
+
+        files = level['_files']
+        if git_stats is None:
+            # Nothing to merge: only the paths change
+            if level_path:
+                for file_node in files:
+                    file_node['path'] = f"{level_path}/{file_node['name']}"
+            level_children.extend(files)
+            continue
+
+        for file_node in files:
+            rel_path = file_node['path']
+            if level_path:
+                file_node['path'] = f"{level_path}/{file_node['name']}"
+            stats = git_stats.get(rel_path)
+            if growth:
+                file_growth = growth.get(rel_path)
+                if file_growth is not None:
+                    stats = git_stats.setdefault(rel_path, {})
+                    stats['growth'] = file_growth
+            apply_file_stats(file_node, stats)
+            level_children.append(file_node)
+
+    return children
+
+
+def check_staleness(repos, fetch_cache_ttl=0, concurrent_sets=1):
     """Check staleness for all repositories in parallel.
 
     Args:
         repos: List of repository paths
+        fetch_cache_ttl: Seconds for which a repository's remote check is
+            reused (see get_repo_staleness_info); 0 contacts every remote
+        concurrent_sets: Number of analysis sets checked at the same time;
+            the thread count is divided between them
 
     Returns:
         list: Staleness info dicts sorted by repo name
     """
-    staleness_infos = []
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {executor.submit(get_repo_staleness_info, repo_path): repo_path for repo_path in repos}
-        for future in as_completed(futures):
-            staleness_infos.append(future.result())
-    staleness_infos.sort(key=lambda x: x['repo'])
+    # Imported here: concurrent.futures pulls in logging, which commands that
+    # never analyze (add, list) shouldn't pay for at startup.
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Mostly waiting on `git fetch` over the network, so use more threads
+    # than there are CPUs
+    max_workers = max(1, min(32, len(repos), (os.cpu_count() or 4) * 4) // concurrent_sets)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='staleness') as executor:
+        # One "now" for the batch, so ages are comparable between repositories
+        staleness_infos = list(executor.map(
+            functools.partial(get_repo_staleness_info, fetch_cache_ttl=fetch_cache_ttl, now=time.time()),
+            repos
+        ))
+    # repos are in path order; the report is ordered by repository name
+    staleness_infos.sort(key=itemgetter('repo'))
     return staleness_infos
 
 
-def analyze_single_repo(repo_path, path_obj, on_progress=None):
+def analyze_single_repo(repo_path, path_obj, on_progress=None, stats_cache=None, languages=None,
+                        is_root_repo=None):
     """Analyze a single repository.
 
     Args:
         repo_path: Path to repository
         path_obj: Path object for analysis set root
         on_progress: Optional callback for progress messages
+        stats_cache: Optional FileStatsCache for per-file git stats and coupling
+        languages: Optional Counter that receives the repository's lines of
+            code per language (see build_directory_tree)
+        is_root_repo: Whether repo_path is the analysis set root itself, if
+            the caller already knows; otherwise the two paths are compared
 
     Returns:
         tuple: (repo_node, files_dict, coupling_data)
-            or (None, None, None) on error
+            or (None, None, None) if cloc or git fails on the repository
     """
+    from concurrent.futures import ThreadPoolExecutor
+
     repo_name = Path(repo_path).name
 
     try:
-        cloc_data = run_cloc(repo_path, on_progress=on_progress)
-        files = {k: v for k, v in cloc_data.items() if k not in ['header', 'SUM']}
-
-        if not files:
-            return None, None, None
-
-        repo_tree = build_directory_tree(files, repo_path)
-        git_stats = get_file_stats(repo_path)
-        coupling = get_coupling_data(repo_path)
-
-        # Single growth pass per repo. cloc keys are absolute, so convert them to the
-        # repo-relative paths git emits before reconciling. Surviving per-file growth is
-        # merged into git_stats; deleted files are injected as nodes after the tree is built.
-        base = Path(repo_path)
-        valid_paths = set()
-        for filepath in files.keys():
-            try:
-                valid_paths.add(str(Path(filepath).relative_to(base)))
-            except ValueError:
-                continue
-        growth = get_growth_data(repo_path, valid_paths=valid_paths)
-        for file_path, file_growth in growth['files'].items():
-            git_stats.setdefault(file_path, {})['growth'] = file_growth
-
-        is_root_repo = Path(repo_path).resolve() == path_obj.resolve()
+        # cloc and the git history passes are independent subprocesses, so the
+        # git side runs on helper threads while cloc runs here. The pool is not
+        # waited on when leaving early (no countable files, or an error): git
+        # runs still in flight finish on their own while the caller moves on.
+        git_pool = ThreadPoolExecutor(max_workers=3)
+        try:
+            if stats_cache is not None:
+                stats_future = git_pool.submit(get_file_stats_cached, repo_path, stats_cache)
+                coupling_future = git_pool.submit(get_coupling_data_cached, repo_path, stats_cache)
+            else:
+                stats_future = git_pool.submit(get_file_stats, repo_path)
+                coupling_future = git_pool.submit(get_coupling_data, repo_path)
+            growth_future = git_pool.submit(get_growth_data, repo_path)
+
+            cloc_data = run_cloc(repo_path, on_progress=on_progress)
+            # The parsed dict becomes the file dict itself: dropping the two
+            # summary keys avoids copying one entry per file into a new dict
+            files = cloc_data
+            files.pop('header', None)
+            files.pop('SUM', None)
+
+            if not files:
+                return None, None, None
+
+            repo_tree = build_directory_tree(files, repo_path, languages)
+            git_stats = stats_future.result()
+            coupling = coupling_future.result()
+            growth = growth_future.result()
+        finally:
+            git_pool.shutdown(wait=False, cancel_futures=True)
+
+        if is_root_repo is None:
+            # Two stat() calls instead of resolving both paths component by component
+            is_root_repo = os.path.samefile(repo_path, path_obj)
         path_prefix = '' if is_root_repo else repo_name
 
-        children = []
-
-        for dirname, subtree in sorted(repo_tree['_dirs'].items()):
-            child = tree_to_schema(subtree, dirname, path_prefix, git_stats)
-            if child:
-                children.append(child)
-
-        for file in sorted(repo_tree['_files'], key=lambda f: f['name']):
-            file_path = f"{path_prefix}/{file['name']}" if path_prefix else file['name']
-            file_node = {
-                'name': file['name'],
-                'type': 'file',
-                'path': file_path,
-                'value': file['value'],
-                'language': file['language'],
-                'extension': file['extension']
-            }
-            stats = git_stats.get(file['path'])
-            apply_file_stats(file_node, stats)
-            children.append(file_node)
-
         repo_node = {
             'name': repo_name,
             'type': 'repository',
             'path': path_prefix if path_prefix else repo_name,
-            'children': children
+            # Growth was collected before the cloc file set was known; only the
+            # surviving files cloc counted (the tree's files) pick theirs up, in
+            # the same pass that converts the tree. Deleted files are injected
+            # as nodes below.
+            'children': _schema_children(repo_tree, path_prefix, git_stats, growth['files'])
         }
 
         # Inject deleted files as zero-size nodes so removals count against net growth
@@ -374,11 +491,16 @@ def analyze_single_repo(repo_path, path_obj, on_progress=None):
 
         return repo_node if repo_node['children'] else None, files, coupling
 
-    except Exception:
+    except (OSError, RuntimeError, ValueError, subprocess.SubprocessError, sqlite3.Error):
+        # cloc or git could not be run on this repository, their output
+        # could not be parsed, or the stats cache could not be read or
+        # written (e.g. locked by another aina process); the repository is
+        # left out of the analysis
         return None, None, None
 
 
-def analyze_repos(analysis_set_name, analysis_set_path, on_staleness_warning=None, on_progress=None):
+def analyze_repos(analysis_set_name, analysis_set_path, on_staleness_warning=None, on_progress=None,
+                  stats_cache=None, fetch_cache_ttl=0, concurrent_sets=1):
     """Analyze all repositories in an analysis set.
 
     Args:
@@ -389,6 +511,13 @@ def analyze_repos(analysis_set_name, analysis_set_path, on_staleness_warning=Non
                               If provided, called with staleness info; should raise to abort.
         on_progress: Optional callback(message) for progress updates.
                      If None, prints to stdout.
+        stats_cache: Optional FileStatsCache; repos whose HEAD is unchanged since
+                     a recent run reuse their git file stats and coupling data.
+        fetch_cache_ttl: Seconds for which a repository's remote check is
+                         reused; 0 contacts every remote.
+        concurrent_sets: Number of analysis sets analyzed at the same time.
+                         Worker counts are divided between them, so running
+                         sets side by side does not multiply the subprocesses.
 
     Returns:
         dict: Analysis results in JSON schema format
@@ -397,11 +526,18 @@ def analyze_repos(analysis_set_name, analysis_set_path, on_staleness_warning=Non
         ValueError: If path doesn't exist or no repos found
         FileNotFoundError: If cloc is not installed
     """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    # Repo workers report progress (e.g. cloc fallbacks) while the main thread
+    # does too; one message at a time keeps lines from interleaving.
+    log_lock = threading.Lock()
+
     def log(msg):
-        if on_progress:
-            on_progress(msg)
-        else:
-            print(msg)
+        with log_lock:
+            if on_progress:
+                on_progress(msg)
+            else:
+                print(msg)
 
     path_obj = Path(analysis_set_path)
 
@@ -417,7 +553,7 @@ def analyze_repos(analysis_set_name, analysis_set_path, on_staleness_warning=Non
 
     # Check repository staleness
     log("\nChecking repository status...")
-    staleness_infos = check_staleness(repos)
+    staleness_infos = check_staleness(repos, fetch_cache_ttl, concurrent_sets)
 
     warning = format_staleness_warning(staleness_infos)
     if warning:
@@ -433,50 +569,73 @@ def analyze_repos(analysis_set_name, analysis_set_path, on_staleness_warning=Non
     # Aggregate statistics
     total_files = 0
     total_lines = 0
-    languages = {}
+    languages = Counter()
     repo_nodes = []
     all_coupling_pairs = []
 
-    for i, repo_path in enumerate(repos, 1):
-        repo_name = Path(repo_path).name
-        log(f"[{i}/{len(repos)}] Analyzing {repo_name}...")
-
-        repo_node, files, coupling = analyze_single_repo(repo_path, path_obj, on_progress=log)
-
-        if repo_node and files:
+    # cloc and git run out-of-process, so threads give real parallelism here. Results
+    # are aggregated on the main thread in discovery order to keep output deterministic.
+    # A few workers beyond the core count keep the CPUs busy while other repos are
+    # between subprocesses (waiting on git or the filesystem).
+    results = [None] * len(repos)
+    # Filled by the workers while they build each repo's tree
+    tallies = [Counter() for _ in repos]
+    max_workers = max(1, min(32, len(repos), (os.cpu_count() or 1) + 4) // concurrent_sets)
+    # discover_repos returns the root as str(path_obj) and subdirectories
+    # below it, so the root repo is found by string comparison
+    root = str(path_obj)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(analyze_single_repo, repo_path, path_obj, on_progress=log,
+                            stats_cache=stats_cache, languages=tallies[i],
+                            is_root_repo=repo_path == root): i
+            for i, repo_path in enumerate(repos)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            # Popped so the finished future (and the cloc file dict it holds)
+            # can be freed; only the file count is kept past this point.
+            i = futures.pop(future)
+            repo_node, files, coupling = future.result()
+            file_count = len(files) if files else 0
+            # Summed over the repo's few languages, not its files
+            line_count = sum(tallies[i].values())
+            results[i] = (repo_node, file_count, line_count, coupling)
+            repo_name = os.path.basename(repos[i])
+            log(f"[{done}/{len(repos)}] Analyzed {repo_name}")
+
+            if repo_node and files:
+                log(f"  {file_count} files, {line_count:,} lines")
+            elif files is None:
+                log(f"  No files found in {repo_name}, skipping")
+            del files
+
+    for (repo_node, file_count, line_count, coupling), tally in zip(results, tallies):
+        if repo_node and file_count:
             repo_nodes.append(repo_node)
 
-            for file in files.values():
-                total_files += 1
-                code_lines = file.get('code', 0)
-                total_lines += code_lines
-                lang = file.get('language', 'Unknown')
-                languages[lang] = languages.get(lang, 0) + code_lines
+            total_files += file_count
+            total_lines += line_count
+            languages.update(tally)
 
             # Collect coupling pairs from this repo
             if coupling and coupling.get('pairs'):
                 all_coupling_pairs.extend(coupling['pairs'])
 
-            log(f"  {len(files)} files, {sum(f.get('code', 0) for f in files.values()):,} lines")
-        elif files is None:
-            log(f"  No files found in {repo_name}, skipping")
-
     if not repo_nodes:
         raise ValueError("No repositories were successfully analyzed")
 
-    # Sort and limit aggregated coupling pairs
-    all_coupling_pairs.sort(key=lambda p: p['count'], reverse=True)
-    all_coupling_pairs = all_coupling_pairs[:500]
+    # Top aggregated coupling pairs, in stable descending count order
+    all_coupling_pairs = heapq.nlargest(500, all_coupling_pairs, key=itemgetter('count'))
 
     analysis_json = {
         'analysis_set': analysis_set_name,
         'root_path': str(analysis_set_path),
-        'generated_at': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+        'generated_at': _utc_now_iso(),
         'stats': {
             'total_files': total_files,
             'total_lines': total_lines,
             'total_repos': len(repo_nodes),
-            'languages': dict(sorted(languages.items(), key=lambda x: x[1], reverse=True))
+            'languages': dict(languages.most_common())
         },
         'coupling': {
             'threshold': 3,
@@ -492,44 +651,92 @@ def analyze_repos(analysis_set_name, analysis_set_path, on_staleness_warning=Non
     return analysis_json
 
 
+def _load_index_entry(json_file):
+    """Read the index entry for one analysis file.
+
+    Args:
+        json_file: Path to an analysis JSON file
+
+    Returns:
+        dict: Index entry, or None if the file could not be read
+    """
+    try:
+        # The tree is never needed here; stop once these keys are read
+        data = read_json_fields(json_file, ('analysis_set', 'generated_at', 'stats'))
+    except (OSError, ValueError) as e:
+        print(f"Warning: Failed to read {json_file.name}: {e}")
+        return None
+
+    return {
+        'name': data.get('analysis_set', json_file.stem),
+        'filename': json_file.name,
+        'generated_at': data.get('generated_at'),
+        'stats': data.get('stats', {})
+    }
+
+
 def generate_analysis_index():
     """Generate index.json listing all available analyses.
 
     Returns:
         bool: True if successful, False on error
     """
+    from concurrent.futures import ThreadPoolExecutor
+
     try:
-        analysis_dir = Path.home() / '.aina' / 'analysis'
+        analysis_dir = get_analysis_dir()
 
         if not analysis_dir.exists():
             return True
 
-        analyses = []
-        for json_file in analysis_dir.glob('*.json'):
-            if json_file.name == 'index.json':
-                continue
+        json_files = [f for f in analysis_dir.glob('*.json') if f.name != 'index.json']
 
-            try:
-                with open(json_file) as f:
-                    data = json.load(f)
-                    analyses.append({
-                        'name': data.get('analysis_set', json_file.stem),
-                        'filename': json_file.name,
-                        'generated_at': data.get('generated_at'),
-                        'stats': data.get('stats', {})
-                    })
-            except Exception as e:
-                print(f"Warning: Failed to read {json_file.name}: {e}")
-                continue
+        # Entries of files whose mtime and size are unchanged since the last
+        # run are reused; only new or rewritten analyses are read.
+        cache_path = analysis_dir / _INDEX_CACHE_NAME
+        try:
+            cache = read_json(cache_path)
+        except (OSError, ValueError):
+            cache = {}
+        if not isinstance(cache, dict):
+            cache = {}
+
+        new_cache = {}
+        stale = []
+        for json_file in json_files:
+            stat = json_file.stat()
+            key = [stat.st_mtime_ns, stat.st_size]
+            cached = cache.get(json_file.name)
+            if cached and cached.get('key') == key:
+                new_cache[json_file.name] = cached
+            else:
+                stale.append((json_file, key))
 
-        analyses.sort(key=lambda x: x['name'])
+        stale_files = [json_file for json_file, _ in stale]
+        if len(stale_files) > 1:
+            # File reads release the GIL, so they overlap across analyses
+            with ThreadPoolExecutor(max_workers=min(32, len(stale_files))) as executor:
+                entries = list(executor.map(_load_index_entry, stale_files))
+        else:
+            # Usually just the analysis that was written; no pool needed
+            entries = [_load_index_entry(json_file) for json_file in stale_files]
+        for (json_file, key), entry in zip(stale, entries):
+            if entry is not None:
+                new_cache[json_file.name] = {'key': key, 'entry': entry}
+
+        analyses = [cached['entry'] for cached in new_cache.values()]
+
+        analyses.sort(key=itemgetter('name'))
+
+        # Unchanged when nothing was added, rewritten or removed
+        if new_cache != cache:
+            write_json(cache_path, new_cache)
 
         index_path = analysis_dir / 'index.json'
-        with open(index_path, 'w') as f:
-            json.dump({
-                'analyses': analyses,
-                'updated_at': datetime.utcnow().isoformat() + 'Z'
-            }, f, indent=2)
+        write_json(index_path, {
+            'analyses': analyses,
+            'updated_at': _utc_now_iso()
+        })
 
         return True
 
@@ -1,10 +1,28 @@
 """CLI command implementations."""
+import atexit
+import functools
 import sqlite3
-import json
 from pathlib import Path
 
-from .database import Database
-from .analysis import analyze_repos, generate_analysis_index
+from .database import Database, FileStatsCache
+from .file_utils import get_analysis_dir, write_json
+
+# Analysis sets run at once by a quiet `analyze --all`
+_MAX_PARALLEL_SETS = 4
+# Seconds for which a repository's remote check is reused between runs
+_FETCH_CACHE_TTL = 60 * 60
+
+
+@functools.lru_cache(maxsize=None)
+def _get_database(db_path):
+    """Return the process-wide Database for db_path, opening it on first use.
+
+    Commands share one connection (and one schema check) per database file;
+    it is closed when the process exits.
+    """
+    database = Database(db_path)
+    atexit.register(database.close)
+    return database
 
 
 def cmd_add(name, path, db_path):
@@ -26,7 +44,7 @@ def cmd_add(name, path, db_path):
     absolute_path = str(Path(path).resolve())
 
     try:
-        database = Database(db_path)
+        database = _get_database(db_path)
         database.add_analysis_set(name, absolute_path)
         print(f"Added analysis set '{name}' -> {absolute_path}")
         return True
@@ -48,7 +66,7 @@ def cmd_list(db_path):
         bool: True if successful, False on error
     """
     try:
-        database = Database(db_path)
+        database = _get_database(db_path)
         sets = database.list_analysis_sets()
 
         if not sets:
@@ -76,15 +94,16 @@ def cmd_remove(name, db_path):
         bool: True if successful, False on error
     """
     try:
-        database = Database(db_path)
+        database = _get_database(db_path)
         success = database.remove_analysis_set(name)
 
         if success:
             print(f"Removed analysis set '{name}'")
 
             # Also remove the JSON file if it exists
-            json_path = Path.home() / '.aina' / 'analysis' / f'{name}.json'
+            json_path = get_analysis_dir() / f'{name}.json'
             if json_path.exists():
+                from .analysis import generate_analysis_index
                 json_path.unlink()
                 print(f"Removed {json_path}")
                 generate_analysis_index()
@@ -98,7 +117,15 @@ def cmd_remove(name, db_path):
         return False
 
 
-def _run_single_analysis(name, analysis_set_path, interactive=True, quiet=False):
+def _cache_options(database, use_cache):
+    """Return the cache arguments for _run_single_analysis."""
+    if not use_cache:
+        return {'stats_cache': None, 'fetch_cache_ttl': 0}
+    return {'stats_cache': FileStatsCache(database), 'fetch_cache_ttl': _FETCH_CACHE_TTL}
+
+
+def _run_single_analysis(name, analysis_set_path, interactive=True, quiet=False, stats_cache=None,
+                         fetch_cache_ttl=0, concurrent_sets=1):
     """Run analysis for a single set.
 
     Args:
@@ -106,12 +133,20 @@ def _run_single_analysis(name, analysis_set_path, interactive=True, quiet=False)
         analysis_set_path: Path to folder containing repositories
         interactive: If True, prompt on staleness warnings
         quiet: If True, suppress per-set output
+        stats_cache: Optional FileStatsCache passed on to analyze_repos
+        fetch_cache_ttl: Remote check reuse period passed on to analyze_repos
+        concurrent_sets: Number of sets analyzed side by side, passed on to
+            analyze_repos to share the worker threads between them
 
     Returns:
         tuple: (success, stats_or_error)
             - On success: (True, {'total_repos': N, 'total_files': N, 'total_lines': N})
             - On failure: (False, 'error message')
     """
+    # Imported by the commands that use it, so list and add do not load
+    # the analysis pipeline and the git modules behind it
+    from .analysis import analyze_repos
+
     on_progress = (lambda msg: None) if quiet else print
 
     def handle_staleness(staleness_infos, behind_count):
@@ -133,15 +168,17 @@ def _run_single_analysis(name, analysis_set_path, interactive=True, quiet=False)
         analysis_json = analyze_repos(
             name, analysis_set_path,
             on_staleness_warning=handle_staleness,
-            on_progress=on_progress
+            on_progress=on_progress,
+            stats_cache=stats_cache,
+            fetch_cache_ttl=fetch_cache_ttl,
+            concurrent_sets=concurrent_sets
         )
 
-        output_dir = Path.home() / '.aina' / 'analysis'
-        output_dir.mkdir(parents=True, exist_ok=True)
-        output_path = output_dir / f"{name}.json"
+        output_path = get_analysis_dir(create=True) / f"{name}.json"
 
-        with open(output_path, 'w') as f:
-            json.dump(analysis_json, f, indent=2)
+        # Streamed down to the repository nodes, so the encoded text of only
+        # one repository is held in memory at a time
+        write_json(output_path, analysis_json, stream_depth=3)
 
         stats = analysis_json['stats']
         if not quiet:
@@ -161,22 +198,25 @@ def _run_single_analysis(name, analysis_set_path, interactive=True, quiet=False)
         return False, str(e)
 
 
-def _analyze_all(db_path, yes=False, quiet=False):
+def _analyze_all(db_path, yes=False, quiet=False, use_cache=True):
     """Analyze all registered analysis sets.
 
     Args:
         db_path: Path to SQLite database
         yes: If True, skip interactive prompts
         quiet: If True, summary output only (implies yes)
+        use_cache: If False, recompute cached git results (see cmd_analyze)
 
     Returns:
         bool: True if all succeeded, False if any failed
     """
+    from .analysis import generate_analysis_index
+
     # quiet implies non-interactive
     interactive = not (yes or quiet)
 
     try:
-        database = Database(db_path)
+        database = _get_database(db_path)
         sets = database.list_analysis_sets()
 
         if not sets:
@@ -186,52 +226,57 @@ def _analyze_all(db_path, yes=False, quiet=False):
         if not quiet:
             print(f"Analyzing {len(sets)} analysis set(s)...\n")
 
-        results = []
-        for i, analysis_set in enumerate(sets, 1):
+        # Sets analyzed side by side (see below); each gets an equal share of
+        # the repository and staleness workers
+        concurrent_sets = min(_MAX_PARALLEL_SETS, len(sets)) if quiet else 1
+
+        def analyze_set(analysis_set):
             name = analysis_set['name']
             path = analysis_set['path']
 
-            if not quiet:
-                print("=" * 60)
-                print(f"[{i}/{len(sets)}] {name}")
-                print("=" * 60)
-
             if not Path(path).exists():
-                results.append({
-                    'name': name,
-                    'success': False,
-                    'error': f"Path does not exist: {path}"
-                })
                 if not quiet:
                     print(f"Error: Path does not exist: {path}\n")
-                continue
-
-            success, data = _run_single_analysis(name, path, interactive=interactive, quiet=quiet)
-            if success:
-                results.append({
-                    'name': name,
-                    'success': True,
-                    'stats': data
-                })
-            else:
-                results.append({
-                    'name': name,
-                    'success': False,
-                    'error': data
-                })
+                return {'name': name, 'success': False, 'error': f"Path does not exist: {path}"}
+
+            success, data = _run_single_analysis(
+                name, path, interactive=interactive, quiet=quiet, concurrent_sets=concurrent_sets,
+                **_cache_options(database, use_cache)
+            )
+            if not success:
                 if not quiet:
                     print(f"Error: {data}\n")
+                return {'name': name, 'success': False, 'error': data}
+            return {'name': name, 'success': True, 'stats': data}
+
+        if quiet and len(sets) > 1:
+            # Nothing is printed or asked per set, so sets are analyzed side
+            # by side; each already fans its repositories out over threads,
+            # hence the small cap. map keeps the summary in registration order.
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=concurrent_sets) as executor:
+                results = list(executor.map(analyze_set, sets))
+        else:
+            results = []
+            for i, analysis_set in enumerate(sets, 1):
+                if not quiet:
+                    print("=" * 60)
+                    print(f"[{i}/{len(sets)}] {analysis_set['name']}")
+                    print("=" * 60)
 
-            if not quiet:
-                print()
+                results.append(analyze_set(analysis_set))
 
-        # Generate index once at end
-        generate_analysis_index()
+                if not quiet:
+                    print()
 
-        # Print summary
         succeeded = sum(1 for r in results if r['success'])
         failed = len(results) - succeeded
 
+        # Generate index once at end, if any analysis file was written
+        if succeeded:
+            generate_analysis_index()
+
+        # Print summary
         print("=" * 60)
         print(f"Reanalysis complete: {succeeded} succeeded, {failed} failed")
         print()
@@ -269,7 +314,7 @@ def _analyze_all(db_path, yes=False, quiet=False):
         return False
 
 
-def cmd_analyze(name, path, db_path, all_sets=False, yes=False, quiet=False):
+def cmd_analyze(name, path, db_path, all_sets=False, yes=False, quiet=False, use_cache=True):
     """Analyze an analysis set and generate JSON.
 
     First time: path is required, registers the analysis set.
@@ -283,50 +328,60 @@ def cmd_analyze(name, path, db_path, all_sets=False, yes=False, quiet=False):
         all_sets: If True, analyze all registered sets
         yes: If True, skip interactive prompts
         quiet: If True, summary output only (implies yes)
+        use_cache: If False, recompute git file stats and coupling and
+            contact every remote instead of reusing recent results
 
     Returns:
         bool: True if successful, False on error
     """
     if all_sets:
-        return _analyze_all(db_path, yes=yes, quiet=quiet)
+        return _analyze_all(db_path, yes=yes, quiet=quiet, use_cache=use_cache)
 
     # quiet implies non-interactive
     interactive = not (yes or quiet)
 
     try:
-        database = Database(db_path)
-        analysis_set = database.get_analysis_set(name)
-
-        if analysis_set:
-            stored_path = analysis_set['path']
-            if path and Path(path).resolve() != Path(stored_path).resolve():
-                print(f"Error: Path mismatch for '{name}'")
-                print(f"  Stored: {stored_path}")
-                print(f"  Given:  {path}")
-                print(f"Use 'aina remove {name}' first to change the path.")
-                return False
-            analysis_set_path = stored_path
-        else:
-            if not path:
-                print(f"Error: Analysis set '{name}' not found.")
-                print(f"Provide a path to create it: aina analyze {name} /path/to/repos")
-                return False
-            if not Path(path).exists():
-                print(f"Error: Path does not exist: {path}")
-                return False
-            # Convert to absolute path for storage
-            absolute_path = str(Path(path).resolve())
-            try:
-                database.add_analysis_set(name, absolute_path)
-                print(f"Registered '{name}' -> {absolute_path}")
-            except sqlite3.IntegrityError:
-                print(f"Error: Analysis set '{name}' already exists")
-                return False
-            analysis_set_path = absolute_path
-
-        success, data = _run_single_analysis(name, analysis_set_path, interactive=interactive, quiet=quiet)
+        database = _get_database(db_path)
+        # Take the write lock before the lookup so a concurrent analyze of the
+        # same name cannot register it between our check and our insert. The
+        # lock is released before the (long) analysis itself runs.
+        with database.transaction('IMMEDIATE'):
+            analysis_set = database.get_analysis_set(name)
+
+            if analysis_set:
+                stored_path = analysis_set['path']
+                if path and Path(path).resolve() != Path(stored_path).resolve():
+                    print(f"Error: Path mismatch for '{name}'")
+                    print(f"  Stored: {stored_path}")
+                    print(f"  Given:  {path}")
+                    print(f"Use 'aina remove {name}' first to change the path.")
+                    return False
+                analysis_set_path = stored_path
+            else:
+                if not path:
+                    print(f"Error: Analysis set '{name}' not found.")
+                    print(f"Provide a path to create it: aina analyze {name} /path/to/repos")
+                    return False
+                if not Path(path).exists():
+                    print(f"Error: Path does not exist: {path}")
+                    return False
+                # Convert to absolute path for storage
+                absolute_path = str(Path(path).resolve())
+                try:
+                    database.add_analysis_set(name, absolute_path)
+                    print(f"Registered '{name}' -> {absolute_path}")
+                except sqlite3.IntegrityError:
+                    print(f"Error: Analysis set '{name}' already exists")
+                    return False
+                analysis_set_path = absolute_path
+
+        success, data = _run_single_analysis(
+            name, analysis_set_path, interactive=interactive, quiet=quiet,
+            **_cache_options(database, use_cache)
+        )
 
         if success:
+            from .analysis import generate_analysis_index
             generate_analysis_index()
             return True
         else:
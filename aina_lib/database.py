@@ -1,48 +1,162 @@
 """Database operations for analysis sets."""
+import contextlib
+import json
 import sqlite3
+import threading
+import time
 from pathlib import Path
 
+# Applied once per connection. WAL lets readers proceed while a write is in
+# progress, and with synchronous=NORMAL commits no longer fsync every time.
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+)
+
+# Statements are kept as constants so every call reuses the same text and
+# therefore the same entry in the connection's prepared-statement cache.
+_SQL_LIST = "SELECT name, path FROM analysis_sets ORDER BY name"
+_SQL_INSERT = "INSERT INTO analysis_sets (name, path) VALUES (?, ?)"
+_SQL_DELETE = "DELETE FROM analysis_sets WHERE name = ?"
+# Without statistics the planner prefers the UNIQUE autoindex for equality
+# lookups, which still has to read the table row for path.
+_SQL_GET_BY_NAME = (
+    "SELECT name, path FROM analysis_sets INDEXED BY idx_sets_name_path WHERE name = ?"
+)
+_SQL_STATS_GET = "SELECT payload, computed_at FROM file_stats_cache WHERE repo_path = ? AND head_sha = ?"
+_SQL_STATS_PUT = (
+    "INSERT OR REPLACE INTO file_stats_cache (repo_path, head_sha, computed_at, payload) "
+    "VALUES (?, ?, ?, ?)"
+)
+_SQL_STATS_PRUNE = """
+    DELETE FROM file_stats_cache
+    WHERE repo_path = ? AND (computed_at < ? OR head_sha NOT IN (
+        SELECT head_sha FROM file_stats_cache WHERE repo_path = ?
+        ORDER BY computed_at DESC LIMIT ?
+    ))
+"""
+
 
 class Database:
 
     def __init__(self, db_path):
         """Initialize database with analysis_sets table.
 
+        A single connection is held for the lifetime of the instance; call
+        close() (or use the instance as a context manager) to release it.
+        The connection is in autocommit mode; group statements with
+        transaction().
+
+        Methods may be called from several threads (see FileStatsCache);
+        they take ``lock`` around their use of the connection, and so must
+        any other direct use of it.
+
         Args:
             db_path: Path to SQLite database file
         """
         self.db_path = db_path
+        self.lock = threading.RLock()
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            db_path, cached_statements=256, isolation_level=None, check_same_thread=False
+        )
+        # Rows support row['name'] as well as row[0] without building a dict each
+        self._conn.row_factory = sqlite3.Row
+        for pragma in _PRAGMAS:
+            self._conn.execute(pragma)
+        # Every statement is IF NOT EXISTS, so this is cheap on an existing
+        # database, and a new one (':memory:', or a file deleted and
+        # recreated at the same path) always gets its tables
         self._init_schema()
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
     def _connect(self):
-        """Create a new database connection."""
-        return sqlite3.connect(self.db_path)
+        """Return the shared database connection."""
+        return self._conn
+
+    def close(self):
+        """Close the database connection.
+
+        Runs ``PRAGMA optimize`` first, which gathers planner statistics
+        (ANALYZE) for tables whose queries would benefit, and is a no-op
+        otherwise.
+        """
+        with self.lock:
+            try:
+                self._conn.execute("PRAGMA optimize")
+            except sqlite3.Error:
+                pass  # e.g. database locked by another process; stats can wait
+            self._conn.close()
+
+    @contextlib.contextmanager
+    def transaction(self, mode='DEFERRED'):
+        """Run the enclosed statements in one transaction.
+
+        Commits on success and rolls back if the block raises. Inside an
+        already open transaction this joins it instead, so methods that use
+        transaction() can be called from a caller's transaction.
+
+        Args:
+            mode: SQLite BEGIN mode ('DEFERRED', 'IMMEDIATE' or 'EXCLUSIVE')
+
+        Yields:
+            sqlite3.Connection: The shared connection
+        """
+        # Held for the whole transaction, so another thread's statements
+        # cannot land inside it
+        with self.lock:
+            if self._conn.in_transaction:
+                yield self._conn
+                return
+
+            self._conn.execute(f"BEGIN {mode}")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
 
     def _init_schema(self):
         """Initialize database schema."""
-        with self._connect() as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS analysis_sets (
-                    id INTEGER PRIMARY KEY,
-                    name TEXT UNIQUE NOT NULL,
-                    path TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            conn.commit()
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_sets (
+                id INTEGER PRIMARY KEY,
+                name TEXT UNIQUE NOT NULL,
+                path TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # Covers both lookup columns, so name lookups and the ordered listing
+        # are answered from the index without visiting the table rows.
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sets_name_path ON analysis_sets(name, path)"
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS file_stats_cache (
+                repo_path TEXT NOT NULL,
+                head_sha TEXT NOT NULL,
+                computed_at REAL NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (repo_path, head_sha)
+            )
+        """)
 
     def list_analysis_sets(self):
         """List all analysis sets from the database.
 
         Returns:
-            List of dicts with 'name' and 'path' keys
+            List of sqlite3.Row with 'name' and 'path' keys
         """
-        with self._connect() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT name, path FROM analysis_sets ORDER BY name")
-            rows = cursor.fetchall()
-            return [{'name': row[0], 'path': row[1]} for row in rows]
+        with self.lock:
+            return self._conn.execute(_SQL_LIST).fetchall()
 
     def add_analysis_set(self, name, path):
         """Add a new analysis set to the database.
@@ -54,12 +168,22 @@ class Database:
         Raises:
             sqlite3.IntegrityError: If name already exists
         """
-        with self._connect() as conn:
-            conn.execute(
-                "INSERT INTO analysis_sets (name, path) VALUES (?, ?)",
-                (name, path)
-            )
-            conn.commit()
+        self.add_analysis_sets([(name, path)])
+
+    def add_analysis_sets(self, rows):
+        """Add several analysis sets in a single transaction.
+
+        All rows are inserted with one commit (one fsync), and none are kept
+        if any of them fails.
+
+        Args:
+            rows: Iterable of (name, path) tuples
+
+        Raises:
+            sqlite3.IntegrityError: If any name already exists
+        """
+        with self.transaction() as conn:
+            conn.executemany(_SQL_INSERT, rows)
 
     def remove_analysis_set(self, name):
         """Remove an analysis set from the database.
@@ -70,10 +194,8 @@ class Database:
         Returns:
             bool: True if set was removed, False if not found
         """
-        with self._connect() as conn:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM analysis_sets WHERE name = ?", (name,))
-            conn.commit()
+        with self.lock:
+            cursor = self._conn.execute(_SQL_DELETE, (name,))
             return cursor.rowcount > 0
 
     def get_analysis_set(self, name):
@@ -83,10 +205,59 @@ class Database:
             name: Name of the analysis set
 
         Returns:
-            dict with 'name' and 'path' keys, or None if not found
+            sqlite3.Row with 'name' and 'path' keys, or None if not found
+        """
+        with self.lock:
+            return self._conn.execute(_SQL_GET_BY_NAME, (name,)).fetchone()
+
+
+class FileStatsCache:
+    """Per-repository git file stats cached in the aina database by HEAD commit.
+
+    git log output only changes when HEAD moves, except that the 3-month and
+    1-year windows slide with the clock, so entries expire after max_age
+    seconds. Only the keep_per_repo most recent commits are kept per repo.
+    Safe to use from several threads at once.
+    """
+
+    def __init__(self, database, max_age=24 * 60 * 60, keep_per_repo=10):
+        """Initialize the cache.
+
+        Args:
+            database: Database whose connection stores the cache
+            max_age: Seconds after which an entry is ignored and replaced
+            keep_per_repo: Number of HEAD commits to keep per repository
+        """
+        self.database = database
+        self.max_age = max_age
+        self.keep_per_repo = keep_per_repo
+
+    def get(self, repo_path, head_sha):
+        """Return cached stats for a repository at a commit.
+
+        Args:
+            repo_path: Absolute path to the repository
+            head_sha: Commit hash of HEAD
+
+        Returns:
+            dict of file stats, or None if missing or expired
+        """
+        with self.database.lock:
+            row = self.database._conn.execute(_SQL_STATS_GET, (repo_path, head_sha)).fetchone()
+        if row is None or row['computed_at'] < time.time() - self.max_age:
+            return None
+        return json.loads(row['payload'])
+
+    def put(self, repo_path, head_sha, stats):
+        """Store stats for a repository at a commit and prune old entries.
+
+        Args:
+            repo_path: Absolute path to the repository
+            head_sha: Commit hash of HEAD
+            stats: JSON-serializable file stats
         """
-        with self._connect() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT name, path FROM analysis_sets WHERE name = ?", (name,))
-            row = cursor.fetchone()
-            return {'name': row[0], 'path': row[1]} if row else None
+        payload = json.dumps(stats, separators=(',', ':'))
+        now = time.time()
+        with self.database.lock, self.database.transaction() as conn:
+            conn.execute(_SQL_STATS_PUT, (repo_path, head_sha, now, payload))
+            conn.execute(_SQL_STATS_PRUNE, (repo_path, now - self.max_age, repo_path, self.keep_per_repo))
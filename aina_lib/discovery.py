@@ -2,6 +2,10 @@
 import os
 from pathlib import Path
 
+# Subdirectories below this count are probed one after another; a thread
+# pool costs more to start than it saves on a few local stat() calls
+_PARALLEL_PROBE_MIN = 8
+
 
 def discover_repos(path):
     """Discover Git repositories in a directory.
@@ -18,21 +22,39 @@ def discover_repos(path):
     Raises:
         ValueError: If path does not exist
     """
-    path_obj = Path(path)
-
-    if not path_obj.exists():
-        raise ValueError(f"Path does not exist: {path}")
-
+    root = str(Path(path))
     repos = []
-    max_depth = 1  # Root (0) + 1 level
-
-    for root, dirs, files in os.walk(path_obj):
-        depth = len(Path(root).relative_to(path_obj).parts)
-
-        if '.git' in dirs:
-            repos.append(str(root))
-
-        if depth >= max_depth:
-            dirs.clear()
+    subdirs = []
+
+    # One scandir of the root instead of a depth-limited walk: DirEntry answers
+    # is_dir() from the directory listing itself, so no Path objects are built
+    # and no extra stat calls are made. Symlinked directories are not descended
+    # into, matching os.walk's default. A missing root is detected by the first
+    # scandir rather than a separate exists() check.
+    try:
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.name == '.git':
+                    if entry.is_dir():
+                        repos.append(root)
+                elif entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+    except FileNotFoundError:
+        raise ValueError(f"Path does not exist: {path}") from None
+    except OSError:
+        return []
+
+    # A subdirectory only needs its .git looked up, not listed: one stat()
+    # however many files it holds
+    git_dirs = [os.path.join(subdir, '.git') for subdir in subdirs]
+    if len(git_dirs) < _PARALLEL_PROBE_MIN:
+        found = map(os.path.isdir, git_dirs)
+    else:
+        # stat() releases the GIL, so on network file systems the round
+        # trips overlap instead of adding up
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(32, len(git_dirs))) as executor:
+            found = list(executor.map(os.path.isdir, git_dirs))
+    repos.extend(subdir for subdir, is_repo in zip(subdirs, found) if is_repo)
 
     return sorted(repos)
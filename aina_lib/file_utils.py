@@ -1,40 +1,318 @@
 """File utility functions."""
-import subprocess
+import codecs
+import functools
+import json
+import os
+import re
 from pathlib import Path
 
 
+# Bytes of the file examined, the same amount `file` looks at by default
+_ENCODING_SAMPLE_SIZE = 1024 * 1024
+# Control characters that never occur in text; libmagic's text_chars table
+# marks the same ones. BEL..CR and ESC are allowed.
+_BINARY_BYTES = bytes([*range(0x00, 0x07), *range(0x0e, 0x1b), *range(0x1c, 0x20), 0x7f])
+_ASCII_TEXT_BYTES = bytes(b for b in range(0x80) if b not in _BINARY_BYTES)
+_NON_BINARY_BYTES = bytes(b for b in range(0x100) if b not in _BINARY_BYTES)
+
+
 def detect_file_encoding(path: Path) -> str:
-    """Detect file encoding using system file command.
+    """Detect file encoding from the file's leading bytes.
 
-    Uses macOS/Linux `file -b --mime-encoding` for detection.
+    Follows the classification of `file -b --mime-encoding`, in process:
+    files starting with a UTF-16 BOM are UTF-16, files containing control
+    characters that do not occur in text are binary, valid UTF-8 (which
+    includes plain ASCII) is 'utf-8', and other 8-bit text is 'iso-8859-1'.
     Returns encoding name compatible with Python's codecs, or 'utf-8' as fallback.
-    Returns None for binary files.
+    Returns None for binary files. Results are cached per inode, size and
+    mtime, so viewing an unchanged file again costs only a stat().
 
     Args:
         path: Path to the file to detect encoding for.
 
     Returns:
-        Encoding name (e.g., 'utf-8', 'iso-8859-1', 'us-ascii') or None for binary.
+        Encoding name (e.g., 'utf-8', 'iso-8859-1', 'utf-16le') or None for binary.
     """
     try:
-        result = subprocess.run(
-            ['file', '-b', '--mime-encoding', str(path)],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if result.returncode == 0:
-            encoding = result.stdout.strip()
-            # file returns error messages to stdout with exit code 0
-            if encoding.startswith('cannot open'):
-                return 'utf-8'
-            if encoding == 'binary':
-                return None
-            # us-ascii is a subset of utf-8; use utf-8 to handle files that
-            # are mostly ASCII but contain occasional non-ASCII UTF-8 bytes.
-            if encoding == 'us-ascii':
-                return 'utf-8'
-            return encoding
-    except (subprocess.TimeoutExpired, FileNotFoundError):
-        pass
-    return 'utf-8'
\ No newline at end of file
+        st = os.stat(path)
+    except OSError:
+        return 'utf-8'
+    return _detect_encoding(os.fspath(path), st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+# Keyed by the file's identity and version rather than by leading bytes:
+# two files can share a prefix and size and still differ further in.
+@functools.lru_cache(maxsize=1024)
+def _detect_encoding(path, ino, size, mtime_ns):
+    """Classify one version of a file; see detect_file_encoding."""
+    try:
+        with open(path, 'rb') as f:
+            sample = f.read(_ENCODING_SAMPLE_SIZE)
+    except OSError:
+        return 'utf-8'
+
+    if not sample:
+        return None
+    if sample.startswith(codecs.BOM_UTF16_LE):
+        return 'utf-16le'
+    if sample.startswith(codecs.BOM_UTF16_BE):
+        return 'utf-16be'
+    # us-ascii is a subset of utf-8; use utf-8 so files that are mostly
+    # ASCII but contain occasional non-ASCII UTF-8 bytes past the sample
+    # still read.
+    if not sample.translate(None, _ASCII_TEXT_BYTES):
+        return 'utf-8'
+    if sample.translate(None, _NON_BINARY_BYTES):
+        return None
+    try:
+        # A full sample may have been cut inside a multi-byte character
+        final = len(sample) < _ENCODING_SAMPLE_SIZE
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=final)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        # Where `file` says unknown-8bit (bytes 0x80-0x9f), latin-1 still
+        # decodes every byte
+        return 'iso-8859-1'
+
+
+# Bytes read at a time by count_lines()
+_COUNT_CHUNK_SIZE = 1024 * 1024
+
+
+def count_lines(path: Path) -> int:
+    """Count the lines of a text file without decoding it.
+
+    Counts what iterating the file in text mode would yield: '\\n', '\\r'
+    and '\\r\\n' each end a line, and trailing text without a line ending
+    is a line of its own. The file is scanned in binary chunks with
+    bytes.count(), so this only holds for ASCII-compatible encodings
+    (UTF-8, ISO-8859-1), not UTF-16.
+
+    Args:
+        path: Path to the file.
+
+    Returns:
+        Number of lines.
+    """
+    lines = 0
+    last = b''
+    with open(path, 'rb') as f:
+        while chunk := f.read(_COUNT_CHUNK_SIZE):
+            lines += chunk.count(b'\n') + chunk.count(b'\r') - chunk.count(b'\r\n')
+            # A '\r\n' split across two chunks was counted twice
+            if last == b'\r' and chunk.startswith(b'\n'):
+                lines -= 1
+            last = chunk[-1:]
+    if last and last not in b'\r\n':
+        lines += 1
+    return lines
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+# json.dumps() builds a new encoder on every call that passes options
+_ENCODER = json.JSONEncoder(separators=(',', ':'), check_circular=False)
+
+
+# Directories already created by ensure_dir() in this process
+_created_dirs = set()
+
+
+def ensure_dir(path: Path) -> Path:
+    """Create a directory and its parents, once per process.
+
+    Later calls for the same path return without touching the filesystem,
+    so it is cheap to call ahead of every write into the directory.
+
+    Args:
+        path: Directory to create.
+
+    Returns:
+        The path that was given.
+    """
+    key = str(path)
+    if key not in _created_dirs:
+        Path(path).mkdir(parents=True, exist_ok=True)
+        _created_dirs.add(key)
+    return path
+
+
+def get_analysis_dir(create: bool = False) -> Path:
+    """Return the directory analysis files are written to, ~/.aina/analysis.
+
+    The home directory is looked up on each call rather than fixed at
+    import, so it follows HOME (and tests that patch Path.home).
+
+    Args:
+        create: If True, create the directory first (once per process, see
+            ensure_dir).
+
+    Returns:
+        Path of the analysis directory.
+    """
+    path = Path.home() / '.aina' / 'analysis'
+    return ensure_dir(path) if create else path
+
+
+def read_json(path: Path):
+    """Parse a JSON file.
+
+    The file is read as bytes and parsed in one call, which skips the text
+    decoding layer and the chunked reads of json.load().
+
+    Args:
+        path: Path to the JSON file.
+
+    Returns:
+        The parsed JSON value.
+    """
+    return json.loads(Path(path).read_bytes())
+
+
+def dump_json_bytes(data) -> bytes:
+    """Serialize data to compact JSON bytes.
+
+    Non-ASCII characters are escaped, so the text is pure ASCII and
+    encoding it is a plain copy rather than a UTF-8 transcoding pass.
+
+    Args:
+        data: JSON-serializable value without reference cycles.
+
+    Returns:
+        The encoded JSON document.
+    """
+    return _ENCODER.encode(data).encode('ascii')
+
+
+def write_json(path: Path, data, stream_depth: int = 0) -> None:
+    """Serialize data to a JSON file.
+
+    Output is compact: without ``indent`` the stdlib uses its C encoder,
+    which is several times faster than the indenting pure-Python one on
+    large analysis trees. The circular-reference check is skipped as well;
+    it records every container in a dict on the way down.
+
+    By default the whole document is encoded and written in one call. With
+    ``stream_depth`` > 0 the containers down to that depth are written
+    member by member, so only one deeper value's text is held in memory at
+    a time; the file content is the same either way.
+
+    Args:
+        path: Path to write to.
+        data: JSON-serializable value without reference cycles.
+        stream_depth: Number of container levels to write member by member.
+    """
+    if stream_depth <= 0:
+        Path(path).write_bytes(dump_json_bytes(data))
+        return
+
+    with open(path, 'w', encoding='ascii') as f:
+        _write_streamed(f.write, _ENCODER.encode, data, stream_depth)
+
+
+def _write_streamed(write, encode, value, depth):
+    """Write value as JSON, splitting containers up to depth levels down."""
+    if depth > 0 and isinstance(value, dict) and all(isinstance(key, str) for key in value):
+        write('{')
+        separator = ''
+        for key, item in value.items():
+            write(f'{separator}{encode(key)}:')
+            _write_streamed(write, encode, item, depth - 1)
+            separator = ','
+        write('}')
+    elif depth > 0 and isinstance(value, (list, tuple)):
+        write('[')
+        separator = ''
+        for item in value:
+            write(separator)
+            _write_streamed(write, encode, item, depth - 1)
+            separator = ','
+        write(']')
+    else:
+        write(encode(value))
+
+
+def read_json_fields(path: Path, fields, chunk_size: int = 65536) -> dict:
+    """Read selected top-level fields of a JSON object file.
+
+    The file is read in growing chunks and only the top-level members up to
+    the last wanted field are parsed, so small metadata keys written ahead
+    of a large subtree are read without touching that subtree. Each chunk
+    is twice the size of the one before, so a field near the end of the
+    file costs at most about twice a full parse.
+
+    Args:
+        path: Path to a file containing a JSON object.
+        fields: Names of the top-level keys to read.
+        chunk_size: Number of bytes to read first.
+
+    Returns:
+        Dict with the requested fields that are present in the file.
+
+    Raises:
+        ValueError: If the file is not valid JSON.
+    """
+    wanted = set(fields)
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    text = ''
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            complete = len(chunk) < chunk_size
+            text += decoder.decode(chunk, final=complete)
+
+            try:
+                found = _scan_object_fields(text, wanted)
+            except ValueError:
+                # Malformed, or cut off mid-value; more input decides which
+                if complete:
+                    raise
+                found = None
+
+            if found is not None:
+                return found
+            if complete:
+                raise ValueError('Unexpected end of JSON data')
+            chunk_size *= 2
+
+
+def _scan_object_fields(text, wanted):
+    """Collect wanted members from the top-level object at the start of text.
+
+    Returns:
+        Dict of the wanted members, or None if text ends before all were found.
+
+    Raises:
+        ValueError: If text is not (the start of) a JSON object.
+    """
+    idx = _WHITESPACE.match(text).end()
+    if text[idx:idx + 1] != '{':
+        raise ValueError('Expected a JSON object')
+    idx = _WHITESPACE.match(text, idx + 1).end()
+    found = {}
+    if text[idx:idx + 1] == '}':
+        return found
+
+    while True:
+        key, idx = _DECODER.raw_decode(text, idx)
+        idx = _WHITESPACE.match(text, idx).end()
+        if text[idx:idx + 1] != ':':
+            raise ValueError('Expected ":" after object key')
+        idx = _WHITESPACE.match(text, idx + 1).end()
+        value, idx = _DECODER.raw_decode(text, idx)
+        # A number (or literal) at the very end of text may continue in the
+        # next chunk; a value only counts once something follows it
+        idx = _WHITESPACE.match(text, idx).end()
+        if idx == len(text):
+            return None
+
+        if key in wanted:
+            found[key] = value
+            if len(found) == len(wanted):
+                return found
+
+        delimiter = text[idx:idx + 1]
+        if delimiter == '}':
+            return found
+        if delimiter != ',':
+            raise ValueError('Expected "," or "}" after object member')
+        idx = _WHITESPACE.match(text, idx + 1).end()
@@ -1,14 +1,44 @@
 """Git repository staleness detection."""
+import hashlib
+import os
 import subprocess
+import time
 from pathlib import Path
-from datetime import datetime, timezone
 
+from .file_utils import ensure_dir, read_json, write_json
 
-def get_repo_staleness_info(repo_path):
+# Seconds to wait for `git fetch --dry-run` before giving up on a remote
+_FETCH_TIMEOUT = 30
+
+
+def _git(repo_path, *args, timeout=None):
+    """Run a git command in a repository and capture its output.
+
+    Output is read as bytes and decoded here, as UTF-8 with replacement
+    (git's encoding for ref names and messages), rather than through
+    subprocess' locale-dependent text mode.
+
+    Returns:
+        tuple: (returncode, stdout, stderr)
+
+    Raises:
+        subprocess.TimeoutExpired: If timeout is given and exceeded
+    """
+    result = subprocess.run(['git', *args], cwd=repo_path, capture_output=True, timeout=timeout)
+    return (result.returncode, result.stdout.decode('utf-8', 'replace'),
+            result.stderr.decode('utf-8', 'replace'))
+
+
+def get_repo_staleness_info(repo_path, fetch_cache_ttl=0, now=None):
     """Check repository staleness and remote status.
 
     Args:
         repo_path: Path to git repository
+        fetch_cache_ttl: Seconds for which the outcome of the remote check
+            (`git fetch --dry-run`) is reused, as long as the origin tracking
+            refs are unchanged; 0 always contacts the remote
+        now: Unix time to measure the last commit's age from; defaults to
+            the current time. Pass one value to give a batch the same "now".
 
     Returns:
         dict with:
@@ -33,111 +63,97 @@ def get_repo_staleness_info(repo_path):
         'error': None
     }
 
-    # Get current branch
-    result = subprocess.run(
-        ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
-        cwd=repo_path,
-        capture_output=True,
-        text=True
+    # One listing answers what used to take a call each: the checked-out
+    # branch (marked '*'), what origin/HEAD points at, and which origin
+    # branches exist. %(HEAD) is one character ('*' or ' '), and ref names
+    # cannot contain spaces.
+    returncode, stdout, _ = _git(
+        repo_path, 'for-each-ref', '--format=%(HEAD)%(refname) %(objectname) %(symref)',
+        'refs/heads/', 'refs/remotes/origin/'
     )
-    if result.returncode == 0:
-        info['branch'] = result.stdout.strip()
-
-    # Get last commit date
-    result = subprocess.run(
-        ['git', 'log', '-1', '--format=%aI'],
-        cwd=repo_path,
-        capture_output=True,
-        text=True
-    )
-    if result.returncode == 0 and result.stdout.strip():
-        info['last_commit_date'] = result.stdout.strip()
-        try:
-            dt = datetime.fromisoformat(info['last_commit_date'].replace('Z', '+00:00'))
-            age_days = (datetime.now(timezone.utc) - dt).days
-            info['last_commit_age_days'] = age_days
-        except ValueError:
-            pass
-
-    # Check if remote exists
-    result = subprocess.run(
-        ['git', 'remote'],
-        cwd=repo_path,
-        capture_output=True,
-        text=True
-    )
-    if result.returncode != 0 or not result.stdout.strip():
-        info['remote_status'] = 'no_remote'
-        return info
+    origin_refs = set()
+    origin_state = []
+    origin_head = ''
+    if returncode == 0:
+        for line in stdout.splitlines():
+            refname, sha, symref = line[1:].split(' ', 2)
+            if refname.startswith('refs/heads/'):
+                if line[0] == '*':
+                    info['branch'] = refname[len('refs/heads/'):]
+            else:
+                origin_refs.add(refname)
+                origin_state.append(f'{refname} {sha}')
+                if refname == 'refs/remotes/origin/HEAD':
+                    origin_head = symref
 
-    # Try to detect default branch from remote HEAD
-    result = subprocess.run(
-        ['git', 'symbolic-ref', 'refs/remotes/origin/HEAD'],
-        cwd=repo_path,
-        capture_output=True,
-        text=True
-    )
-    if result.returncode == 0:
-        ref = result.stdout.strip()
-        if ref.startswith('refs/remotes/origin/'):
-            info['default_branch'] = ref.replace('refs/remotes/origin/', '')
+    # Get last commit date, plus the same instant as a Unix timestamp so the
+    # age is integer arithmetic rather than a parse of the ISO date
+    returncode, stdout, _ = _git(repo_path, 'log', '-1', '--format=%aI %at')
+    if returncode == 0 and stdout.strip():
+        iso_date, _, timestamp = stdout.strip().partition(' ')
+        info['last_commit_date'] = iso_date
+        # A commit but no checked-out branch: detached HEAD
+        if info['branch'] is None:
+            info['branch'] = 'HEAD'
+        if now is None:
+            now = time.time()
+        # Floor division, like timedelta.days
+        info['last_commit_age_days'] = int((now - int(timestamp)) // 86400)
+
+    # Check if remote exists; origin's tracking refs already prove it
+    if not origin_refs:
+        returncode, stdout, _ = _git(repo_path, 'remote')
+        if returncode != 0 or not stdout.strip():
+            info['remote_status'] = 'no_remote'
+            return info
 
-    # If symbolic-ref failed, check for common branch names
-    if not info['default_branch']:
+    # Detect default branch from remote HEAD, else check for common branch names
+    if origin_head.startswith('refs/remotes/origin/'):
+        info['default_branch'] = origin_head[len('refs/remotes/origin/'):]
+    else:
         for branch_name in ['main', 'master', 'trunk', 'dev']:
-            check = subprocess.run(
-                ['git', 'rev-parse', '--verify', f'refs/remotes/origin/{branch_name}'],
-                cwd=repo_path,
-                capture_output=True,
-                text=True
-            )
-            if check.returncode == 0:
+            if f'refs/remotes/origin/{branch_name}' in origin_refs:
                 info['default_branch'] = branch_name
                 break
 
-    # Try git fetch --dry-run to check for updates
-    result = subprocess.run(
-        ['git', 'fetch', '--dry-run'],
-        cwd=repo_path,
-        capture_output=True,
-        text=True,
-        timeout=30
-    )
+    fetch = None
+    if fetch_cache_ttl > 0:
+        cache_path = _fetch_cache_path(repo_path)
+        fetch = _read_fetch_cache(cache_path, origin_state, fetch_cache_ttl)
+    if fetch is None:
+        fetch = _dry_run_fetch(repo_path)
+        # A failed check (timeout, DNS, auth) is not kept: it may well be
+        # transient, and the next run should contact the remote again
+        if fetch_cache_ttl > 0 and not fetch['failed']:
+            try:
+                ensure_dir(cache_path.parent)
+                write_json(cache_path, {**fetch, 'origin_state': origin_state})
+            except OSError:
+                pass  # Only a cache; the check itself succeeded
 
-    if result.returncode != 0:
+    if fetch['failed']:
         info['remote_status'] = 'fetch_failed'
-        stderr = result.stderr.strip()
-        if stderr:
-            info['error'] = stderr.split('\n')[0]
+        info['error'] = fetch['error']
         return info
 
-    # Check if fetch output indicates updates available
-    fetch_output = result.stderr.strip()
-    if fetch_output and 'From' in fetch_output:
+    if fetch['updates']:
         info['remote_status'] = 'behind'
-        # Try to count commits behind
+        # Try to count commits behind, against the branch's own upstream
+        # if origin has it, else against the default branch
         if info['branch']:
-            count_result = subprocess.run(
-                ['git', 'rev-list', '--count', f'{info["branch"]}..origin/{info["branch"]}'],
-                cwd=repo_path,
-                capture_output=True,
-                text=True
-            )
-            if count_result.returncode == 0 and count_result.stdout.strip():
-                try:
-                    info['commits_behind'] = int(count_result.stdout.strip())
-                except ValueError:
-                    pass
+            if f'refs/remotes/origin/{info["branch"]}' in origin_refs:
+                target = info['branch']
             elif info['default_branch'] and info['default_branch'] != info['branch']:
-                count_result = subprocess.run(
-                    ['git', 'rev-list', '--count', f'{info["branch"]}..origin/{info["default_branch"]}'],
-                    cwd=repo_path,
-                    capture_output=True,
-                    text=True
+                target = info['default_branch']
+            else:
+                target = None
+            if target:
+                returncode, stdout, _ = _git(
+                    repo_path, 'rev-list', '--count', f'{info["branch"]}..origin/{target}'
                 )
-                if count_result.returncode == 0 and count_result.stdout.strip():
+                if returncode == 0 and stdout.strip():
                     try:
-                        info['commits_behind'] = int(count_result.stdout.strip())
+                        info['commits_behind'] = int(stdout.strip())
                     except ValueError:
                         pass
     else:
@@ -146,6 +162,56 @@ def get_repo_staleness_info(repo_path):
     return info
 
 
+def _dry_run_fetch(repo_path):
+    """Ask the remote whether it has updates, without fetching them.
+
+    Repositories are checked concurrently, so an unreachable remote is
+    reported for this repository rather than raised out of the whole check.
+
+    Returns:
+        dict with 'failed' (bool), 'error' (first line of git's message or
+        None) and 'updates' (bool: the remote has commits not fetched yet)
+    """
+    try:
+        returncode, _, stderr = _git(repo_path, 'fetch', '--dry-run', timeout=_FETCH_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        return {'failed': True, 'error': f'git fetch timed out after {_FETCH_TIMEOUT}s', 'updates': False}
+
+    stderr = stderr.strip()
+    if returncode != 0:
+        return {'failed': True, 'error': stderr.split('\n')[0] if stderr else None, 'updates': False}
+    # Fetch lists what it would download under a "From <url>" line
+    return {'failed': False, 'error': None, 'updates': bool(stderr) and 'From' in stderr}
+
+
+def _fetch_cache_path(repo_path):
+    """Return the file holding the last remote check of a repository."""
+    digest = hashlib.blake2b(os.path.abspath(repo_path).encode(), digest_size=8).hexdigest()
+    return Path.home() / '.aina' / 'fetchcache' / f'{digest}.json'
+
+
+def _read_fetch_cache(cache_path, origin_state, ttl):
+    """Return a stored remote check if it is recent and still applies.
+
+    A fetch or pull since the check moves the origin tracking refs, which
+    invalidates it: the remote's answer was relative to those refs.
+
+    Returns:
+        dict as from _dry_run_fetch, or None if there is no usable entry
+    """
+    try:
+        if time.time() - os.stat(cache_path).st_mtime >= ttl:
+            return None
+        cached = read_json(cache_path)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.pop('origin_state', None) != origin_state:
+        return None
+    if set(cached) != {'failed', 'error', 'updates'}:
+        return None
+    return cached
+
+
 def format_staleness_warning(staleness_infos):
     """Format staleness info into a table.
 
@@ -193,22 +259,13 @@ def format_staleness_warning(staleness_infos):
 
         rows.append((status_str, repo, branch, date_str, age_str))
 
-    col_widths = [
-        max(len(row[0]) for row in rows),
-        max(len(row[1]) for row in rows),
-        max(len(row[2]) for row in rows),
-        max(len(row[3]) for row in rows),
-        max(len(row[4]) for row in rows),
-    ]
+    # One pass over the columns, and one row template with the widths baked in
+    col_widths = [max(map(len, column)) for column in zip(*rows)]
+    row_template = f"  {{}}  {{:<{col_widths[1]}}}  {{:<{col_widths[2]}}}  {{}}  ({{:>{col_widths[4]}}})"
 
-    lines = []
     header = f"  {'STATUS':<{col_widths[0]}}  {'REPOSITORY':<{col_widths[1]}}  {'BRANCH':<{col_widths[2]}}  {'LAST LOCAL COMMIT':<{col_widths[3] + col_widths[4] + 4}}"
-    lines.append(header)
-    lines.append('  ' + '-' * (len(header) - 2))
-
-    for row in rows:
-        line = f"  {row[0]}  {row[1]:<{col_widths[1]}}  {row[2]:<{col_widths[2]}}  {row[3]}  ({row[4]:>{col_widths[4]}})"
-        lines.append(line)
+    lines = [header, '  ' + '-' * (len(header) - 2)]
+    lines.extend(row_template.format(*row) for row in rows)
 
     if errors:
         lines.append('')
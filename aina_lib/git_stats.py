@@ -1,8 +1,172 @@
 """Git file statistics functions."""
+import calendar
+import functools
+import heapq
+import os
 import subprocess
-from datetime import datetime, timezone
+import sys
+import time
+from datetime import datetime
 from collections import defaultdict
 from itertools import combinations
+from operator import itemgetter
+from pathlib import Path
+
+_MINUS = ord('-')
+# Most bytes taken from a git output pipe per read
+_PIPE_READ_SIZE = 64 * 1024
+
+
+@functools.lru_cache(maxsize=8192)
+def _iso_timestamp(value):
+    """Convert a git strict ISO 8601 date (``%aI``) in bytes to a Unix timestamp.
+
+    The ``YYYY-MM-DDTHH:MM:SS+HH:MM`` form git emits is sliced directly into
+    calendar.timegm, skipping a datetime object per commit. Any other form
+    goes through datetime.fromisoformat. Results are memoized: the stats
+    log of each repository analyzed, and the --follow helper's per-file
+    logs, keep meeting the same commit dates.
+
+    Raises:
+        ValueError: If the value is not an ISO 8601 date
+    """
+    if len(value) == 25:
+        offset = int(value[20:22]) * 3600 + int(value[23:25]) * 60
+        if value[19] == _MINUS:
+            offset = -offset
+        return calendar.timegm((
+            int(value[0:4]), int(value[5:7]), int(value[8:10]),
+            int(value[11:13]), int(value[14:16]), int(value[17:19])
+        )) - offset
+    return datetime.fromisoformat(value.decode('ascii').replace('Z', '+00:00')).timestamp()
+
+
+def _git_command(repo_path):
+    """Return the git argv prefix for commands run in a repository.
+
+    For a regular checkout the git and work tree directories are passed
+    explicitly, so git skips its repository discovery on every run. Where
+    ``.git`` is a file (worktrees, submodules) discovery is left to git.
+
+    Args:
+        repo_path: Path to the repository root
+
+    Returns:
+        list: Arguments to start a git command line with
+    """
+    return _git_command_for(os.path.abspath(repo_path))
+
+
+@functools.lru_cache(maxsize=None)
+def _git_command_for(repo_path):
+    git_dir = os.path.join(repo_path, '.git')
+    if os.path.isdir(git_dir):
+        return ['git', f'--git-dir={git_dir}', f'--work-tree={repo_path}']
+    return ['git']
+
+def _stream_nul_fields(args, repo_path):
+    """Yield the NUL-separated fields of a command's output while it runs.
+
+    Fields are parsed as git produces them, and the full output is never
+    held in memory at once. Closing the generator early stops reading
+    and waits for the process.
+
+    Args:
+        args: Command line to run
+        repo_path: Working directory for the command
+
+    Raises:
+        subprocess.CalledProcessError: After the last field, if the command
+            exited with a non-zero status
+    """
+    with subprocess.Popen(args, cwd=repo_path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as proc:
+        rest = b''
+        while chunk := proc.stdout.read1(_PIPE_READ_SIZE):
+            fields = (rest + chunk).split(b'\0')
+            # The last field may continue in the next chunk
+            rest = fields.pop()
+            yield from fields
+        if rest:
+            yield rest
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, args)
+
+
+def get_head_commit(repo_path):
+    """Get the commit hash HEAD points to.
+
+    Args:
+        repo_path: Path to git repository
+
+    Returns:
+        str: Commit hash, or None if there is no commit (or not a repo)
+    """
+    result = subprocess.run(
+        _git_command(repo_path) + ['rev-parse', '--verify', '-q', 'HEAD'],
+        cwd=repo_path,
+        capture_output=True
+    )
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip().decode('ascii')
+
+
+def get_file_stats_cached(repo_path, cache):
+    """Get file statistics through a cache keyed by the repository's HEAD.
+
+    Args:
+        repo_path: Path to git repository
+        cache: Object with get(repo_path, head_sha) and put(repo_path, head_sha, stats),
+            such as database.FileStatsCache. get() must return a new dict each time,
+            since callers add entries to the result.
+
+    Returns:
+        dict: Same as get_file_stats
+    """
+    return _get_cached(repo_path, cache, None, lambda: _file_stats(repo_path), {})
+
+
+def get_coupling_data_cached(repo_path, cache):
+    """Get coupling data through a cache keyed by the repository's HEAD.
+
+    Args:
+        repo_path: Path to git repository
+        cache: Same as for get_file_stats_cached; entries are kept apart
+            from the file stats of the same repository and commit.
+
+    Returns:
+        dict: Same as get_coupling_data with its default threshold
+    """
+    return _get_cached(repo_path, cache, 'coupling', lambda: _coupling_data(repo_path),
+                       {'threshold': 3, 'pairs': []})
+
+
+def _get_cached(repo_path, cache, kind, compute, failed):
+    """Look up compute()'s result for the repository's HEAD, computing it on a miss.
+
+    Resolved repository paths are absolute, so prefixing one with
+    ``kind:`` gives a cache key no repository path can collide with.
+    If compute() raises CalledProcessError, ``failed`` is returned and
+    nothing is stored: a git failure may be transient (a lock, an
+    interrupted run), and must not stand in for the commit's real result.
+    """
+    head = get_head_commit(repo_path)
+    key = None
+    if head is not None:
+        key = str(Path(repo_path).resolve())
+        if kind:
+            key = f'{kind}:{key}'
+        value = cache.get(key, head)
+        if value is not None:
+            return value
+
+    try:
+        value = compute()
+    except subprocess.CalledProcessError:
+        return failed
+    if key is not None:
+        cache.put(key, head, value)
+    return value
 
 
 def get_file_stats(repo_path, coupling_threshold=3):
@@ -21,21 +185,32 @@ def get_file_stats(repo_path, coupling_threshold=3):
             }
         }
 
-    Handles renames: if a file was renamed within the 1-year period,
-    uses --follow to get accurate commit counts including pre-rename history.
+    Handles renames: if a file was renamed within the 1-year period, its
+    earlier commits under the old name are credited to the current name,
+    so counts include pre-rename history without a --follow pass per file.
     """
-    result = subprocess.run(
-        ['git', 'log', '-M', '--name-status', '--format=COMMIT|%aI|%aN', '--since=1 year ago'],
-        cwd=repo_path,
-        capture_output=True,
-        text=True
-    )
-
-    if result.returncode != 0:
+    try:
+        return _file_stats(repo_path)
+    except subprocess.CalledProcessError:
         return {}
 
-    now = datetime.now(timezone.utc)
-    three_months_ago = now.timestamp() - (90 * 24 * 60 * 60)
+
+def _file_stats(repo_path):
+    """get_file_stats without the error handling.
+
+    Raises:
+        subprocess.CalledProcessError: If git log fails
+    """
+    # -z separates every field with NUL and leaves paths unquoted, so paths
+    # with spaces or non-ASCII characters come through verbatim. The fields
+    # are parsed as git writes them rather than after it exits.
+    tokens = _stream_nul_fields(
+        _git_command(repo_path) + ['log', '-z', '-M', '--name-status', '--format=COMMIT%x00%aI%x00%aN',
+         '--since=1 year ago'],
+        repo_path
+    )
+
+    three_months_ago = time.time() - (90 * 24 * 60 * 60)
 
     stats = defaultdict(lambda: {
         'commits_3m': 0,
@@ -44,69 +219,86 @@ def get_file_stats(repo_path, coupling_threshold=3):
         'contributors_set': set()
     })
 
-    renamed_files = set()
+    # Old path -> path it was later renamed to. The log runs newest first, so
+    # a rename is seen before the older commits made under the old name, and
+    # chains (a -> b -> c) resolve on insert because b -> c is already known.
+    rename_map = {}
+    pending_renames = []
     current_date = None
-    current_timestamp = None
+    current_in_3m = False
     current_author = None
 
-    for line in result.stdout.split('\n'):
-        line = line.strip()
-        if not line:
-            continue
-
-        if line.startswith('COMMIT|'):
-            parts = line.split('|')
-            current_date = parts[1] if len(parts) > 1 else None
-            current_author = parts[2] if len(parts) > 2 else None
-            try:
-                dt = datetime.fromisoformat(current_date.replace('Z', '+00:00'))
-                current_timestamp = dt.timestamp()
-            except ValueError:
-                current_timestamp = 0
-            continue
-
-        parts = line.split('\t')
-        if len(parts) < 2:
-            continue
-
-        status = parts[0]
+    # Token stream: COMMIT, date, author, then per changed file a status
+    # followed by one path (two for renames and copies). Only the per-commit
+    # date/author and each path are decoded, never the whole log.
+    try:
+        for token in tokens:
+            if token == b'COMMIT':
+                # Renames apply from the next (older) commit on, not to other
+                # entries of the renaming commit itself
+                for old_path, new_path in pending_renames:
+                    rename_map[old_path] = new_path
+                pending_renames.clear()
+
+                date = next(tokens, b'')
+                author = next(tokens, None)
+                current_date = date.decode('ascii', 'replace') or None
+                # Interned, so the contributor sets of all files an author
+                # touched share one string instead of one per commit
+                current_author = sys.intern(author.decode('utf-8', 'replace')) if author is not None else None
+                # Decided once per commit, for all of its file entries
+                try:
+                    current_in_3m = _iso_timestamp(date) >= three_months_ago
+                except ValueError:
+                    current_in_3m = False
+                continue
 
-        if status.startswith('R'):
-            if len(parts) == 3:
-                old_path, new_path = parts[1], parts[2]
-                renamed_files.add(new_path)
-                file_path = new_path
-            else:
+            # The first status after a commit header follows a newline
+            if token[:1] == b'\n':
+                token = token[1:]
+            if not token:
                 continue
-        elif status in ('M', 'A', 'D'):
-            file_path = parts[1]
-        else:
-            continue
 
-        stats[file_path]['commits_1y'] += 1
+            status = token[:1]
+
+            if status == b'R' or status == b'C':
+                old_path = next(tokens, None)
+                new_path = next(tokens, None)
+                if new_path is None:
+                    break
+                if status == b'C':
+                    continue
+                new_path = new_path.decode('utf-8', 'replace')
+                file_path = rename_map.get(new_path, new_path)
+                pending_renames.append((old_path.decode('utf-8', 'replace'), file_path))
+            else:
+                path = next(tokens, None)
+                if path is None:
+                    break
+                if token not in (b'M', b'A', b'D'):
+                    continue
+                file_path = path.decode('utf-8', 'replace')
+                file_path = rename_map.get(file_path, file_path)
 
-        if current_timestamp and current_timestamp >= three_months_ago:
-            stats[file_path]['commits_3m'] += 1
+            file_stats = stats[file_path]
+            file_stats['commits_1y'] += 1
 
-        if stats[file_path]['last_commit_date'] is None:
-            stats[file_path]['last_commit_date'] = current_date
+            if current_in_3m:
+                file_stats['commits_3m'] += 1
 
-        if current_author:
-            stats[file_path]['contributors_set'].add(current_author)
+            if file_stats['last_commit_date'] is None:
+                file_stats['last_commit_date'] = current_date
 
-    # For renamed files, use --follow to get accurate history
-    for file_path in renamed_files:
-        follow_stats = get_file_stats_with_follow(repo_path, file_path, three_months_ago)
-        if follow_stats:
-            # Merge contributors from both passes (follow may have more from pre-rename)
-            follow_stats['contributors_set'].update(stats[file_path]['contributors_set'])
-            stats[file_path] = follow_stats
+            if current_author:
+                file_stats['contributors_set'].add(current_author)
+    finally:
+        tokens.close()
 
     # Convert contributors_set to final format
     result = {}
     for file_path, file_stats in stats.items():
         contributors_set = file_stats.pop('contributors_set', set())
-        contributors_list = sorted(list(contributors_set))
+        contributors_list = sorted(contributors_set)
         file_stats['contributors'] = {
             'count': len(contributors_list),
             'names': contributors_list
@@ -119,7 +311,8 @@ def get_file_stats(repo_path, coupling_threshold=3):
 def get_file_stats_with_follow(repo_path, file_path, three_months_timestamp):
     """Get accurate commit stats for a single file using --follow.
 
-    Used for renamed files to include pre-rename commit history.
+    get_file_stats resolves renames from its own log pass; this per-file
+    variant is kept for callers that need git's --follow semantics.
 
     Args:
         repo_path: Path to git repository
@@ -129,11 +322,12 @@ def get_file_stats_with_follow(repo_path, file_path, three_months_timestamp):
     Returns:
         dict with commits_3m, commits_1y, last_commit_date, contributors_set, or None on error
     """
+    # Date and author are NUL-separated, like in get_file_stats, so author
+    # names keep any separator-like characters
     result = subprocess.run(
-        ['git', 'log', '--follow', '--format=%aI|%aN', '--since=1 year ago', '--', file_path],
+        _git_command(repo_path) + ['log', '--follow', '--format=%aI%x00%aN', '--since=1 year ago', '--', file_path],
         cwd=repo_path,
-        capture_output=True,
-        text=True
+        capture_output=True
     )
 
     if result.returncode != 0 or not result.stdout.strip():
@@ -144,25 +338,22 @@ def get_file_stats_with_follow(repo_path, file_path, three_months_timestamp):
     last_commit_date = None
     contributors_set = set()
 
-    for line in result.stdout.strip().split('\n'):
+    for line in result.stdout.strip().split(b'\n'):
         if not line:
             continue
 
-        parts = line.split('|')
-        date_str = parts[0]
-        author = parts[1] if len(parts) > 1 else None
+        date, _, author = line.partition(b'\0')
 
         commits_1y += 1
 
         if last_commit_date is None:
-            last_commit_date = date_str
+            last_commit_date = date
 
         if author:
-            contributors_set.add(author)
+            contributors_set.add(author.decode('utf-8', 'replace'))
 
         try:
-            dt = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-            if dt.timestamp() >= three_months_timestamp:
+            if _iso_timestamp(date) >= three_months_timestamp:
                 commits_3m += 1
         except ValueError:
             pass
@@ -170,7 +361,7 @@ def get_file_stats_with_follow(repo_path, file_path, three_months_timestamp):
     return {
         'commits_3m': commits_3m,
         'commits_1y': commits_1y,
-        'last_commit_date': last_commit_date,
+        'last_commit_date': last_commit_date.decode('ascii', 'replace'),
         'contributors_set': contributors_set
     }
 
@@ -204,7 +395,7 @@ def _list_git_paths(repo_path, args):
     output. Returns an empty set on any git error (e.g. a repo with no commits).
     """
     result = subprocess.run(
-        ['git', '-c', 'core.quotepath=false'] + args,
+        _git_command(repo_path) + ['-c', 'core.quotepath=false'] + args,
         cwd=repo_path,
         capture_output=True,
         text=True
@@ -254,10 +445,10 @@ def get_growth_data(repo_path, valid_paths=None):
         }
 
     result = subprocess.run(
-        ['git', 'log', '-M', '--numstat', '--no-merges', '--format=COMMIT|%aI', '--since=1 year ago'],
+        # %at: only the commit's Unix time is needed here, not its ISO date
+        _git_command(repo_path) + ['log', '-M', '--numstat', '--no-merges', '--format=COMMIT|%at', '--since=1 year ago'],
         cwd=repo_path,
-        capture_output=True,
-        text=True
+        capture_output=True
     )
 
     if result.returncode != 0:
@@ -275,8 +466,7 @@ def get_growth_data(repo_path, valid_paths=None):
         '--since=1 year ago', '--name-only', '--format='
     ])
 
-    now = datetime.now(timezone.utc)
-    three_months_ago = now.timestamp() - (90 * 24 * 60 * 60)
+    three_months_ago = time.time() - (90 * 24 * 60 * 60)
 
     valid_set = set(valid_paths) if valid_paths is not None else None
 
@@ -288,29 +478,28 @@ def get_growth_data(repo_path, valid_paths=None):
         'last_year': {'added': 0, 'deleted': 0},
     }
 
-    current_timestamp = None
+    in_3m = False
 
-    for line in result.stdout.split('\n'):
+    for line in result.stdout.split(b'\n'):
         if not line.strip():
             continue
 
-        if line.startswith('COMMIT|'):
-            parts = line.split('|', 1)
-            date_str = parts[1] if len(parts) > 1 else ''
+        if line.startswith(b'COMMIT|'):
+            # Decided once per commit, for all of its numstat lines
             try:
-                dt = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-                current_timestamp = dt.timestamp()
+                in_3m = int(line[7:]) >= three_months_ago
             except ValueError:
-                current_timestamp = 0
+                in_3m = False
             continue
 
-        parts = line.split('\t')
+        parts = line.split(b'\t')
         if len(parts) < 3:
             continue
 
-        added_str, deleted_str, raw_path = parts[0], parts[1], parts[2]
-        if added_str == '-' or deleted_str == '-':
+        added_str, deleted_str = parts[0], parts[1]
+        if added_str == b'-' or deleted_str == b'-':
             continue  # binary file: numstat reports '-' for both columns
+        raw_path = parts[2].decode('utf-8', 'replace')
 
         try:
             added = int(added_str)
@@ -318,8 +507,6 @@ def get_growth_data(repo_path, valid_paths=None):
         except ValueError:
             continue
 
-        in_3m = current_timestamp is not None and current_timestamp >= three_months_ago
-
         # Repo totals: deletion-inclusive, not filtered to surviving files.
         totals['last_year']['added'] += added
         totals['last_year']['deleted'] += deleted
@@ -392,44 +579,52 @@ def get_coupling_data(repo_path, threshold=3, max_pairs=500):
 
     Pairs are sorted by count (descending) and limited to max_pairs.
     """
-    result = subprocess.run(
-        ['git', 'log', '-M', '--name-status', '--format=COMMIT|%H', '--since=1 year ago'],
-        cwd=repo_path,
-        capture_output=True,
-        text=True
-    )
-
-    if result.returncode != 0:
+    try:
+        return _coupling_data(repo_path, threshold, max_pairs)
+    except subprocess.CalledProcessError:
         return {'threshold': threshold, 'pairs': []}
 
-    # Collect files per commit
-    commits = []  # List of sets of files
-    current_files = set()
-
-    for line in result.stdout.split('\n'):
-        line = line.strip()
-        if not line:
-            continue
 
-        if line.startswith('COMMIT|'):
-            # Save previous commit's files if any
-            if current_files:
-                commits.append(current_files)
-            current_files = set()
-            continue
+def _coupling_data(repo_path, threshold=3, max_pairs=500):
+    """get_coupling_data without the error handling.
 
-        parts = line.split('\t')
-        if len(parts) < 2:
-            continue
+    Raises:
+        subprocess.CalledProcessError: If git log fails
+    """
+    # Framed with NUL like get_file_stats, so paths come through unquoted
+    # and match the file paths in the tree. --name-only lists just the
+    # paths (renames under their new name), without a status per file or
+    # the old path of each rename. Each commit header is an empty field,
+    # which no path can be.
+    tokens = _stream_nul_fields(
+        _git_command(repo_path) + ['log', '-z', '-M', '--name-only', '--format=%x00', '--since=1 year ago'],
+        repo_path
+    )
 
-        status = parts[0]
+    # Collect files per commit
+    commits = []  # List of sets of files
+    current_files = set()
+    at_header = False
+
+    try:
+        for token in tokens:
+            if not token:
+                # Save previous commit's files if any
+                if current_files:
+                    commits.append(current_files)
+                    current_files = set()
+                at_header = True
+                continue
 
-        if status.startswith('R'):
-            if len(parts) == 3:
-                # For renames, track the new path
-                current_files.add(parts[2])
-        elif status in ('M', 'A', 'D'):
-            current_files.add(parts[1])
+            # A newline separates the header from the commit's first path
+            if at_header:
+                token = token[1:]
+                at_header = False
+            # Interned: the per-commit sets are all held until the end, and
+            # would otherwise keep a separate copy of a path per commit
+            current_files.add(sys.intern(token.decode('utf-8', 'replace')))
+    finally:
+        tokens.close()
 
     # Don't forget the last commit
     if current_files:
@@ -447,16 +642,13 @@ def get_coupling_data(repo_path, threshold=3, max_pairs=500):
         for file_a, file_b in combinations(sorted(files), 2):
             co_changes[(file_a, file_b)] += 1
 
-    # Filter by threshold and sort by count
+    # Filter by threshold, then keep the max_pairs most frequent (same order
+    # as a stable sort by count, descending); only those become dicts
+    counted = [(pair, count) for pair, count in co_changes.items() if count >= threshold]
     pairs = [
         {'files': list(pair), 'count': count}
-        for pair, count in co_changes.items()
-        if count >= threshold
+        for pair, count in heapq.nlargest(max_pairs, counted, key=itemgetter(1))
     ]
-    pairs.sort(key=lambda p: p['count'], reverse=True)
-
-    # Limit to max_pairs
-    pairs = pairs[:max_pairs]
 
     return {
         'threshold': threshold,
@@ -1,14 +1,28 @@
 """HTTP server for serving analysis results."""
+import functools
+import gzip
 import http.server
+import os
+import re
 import shutil
-import socketserver
 import subprocess
+import threading
 import urllib.parse
 import webbrowser
-import json
+from collections import OrderedDict
 from pathlib import Path
 
-from .file_utils import detect_file_encoding
+from .file_utils import count_lines, detect_file_encoding, dump_json_bytes, get_analysis_dir, read_json_fields
+
+# A non-empty, non-comment .clocignore line, without surrounding whitespace
+_PATTERN_LINE = re.compile(r'^\s*([^#\s].*?)\s*$', re.MULTILINE)
+# Analysis files at least this large are sent gzip-compressed to clients
+# that accept it; smaller ones (the index) are not worth the header
+_GZIP_MIN_SIZE = 1024
+# Upper bound on the analysis bytes (plain plus gzipped) kept in memory by a
+# server; least recently served files are dropped first, and a file larger
+# than this on its own is read from disk on every request
+_FILE_CACHE_MAX_BYTES = 64 * 1024 * 1024
 
 
 def create_request_handler(frontend_dir, analysis_dir):
@@ -21,7 +35,87 @@ def create_request_handler(frontend_dir, analysis_dir):
     Returns:
         Request handler class
     """
+    # Analysis file name -> [(mtime_ns, size), content, gzipped content or
+    # None], least recently served first. Shared by the handler threads; an
+    # entry is reused until the file on disk changes, and each version is
+    # compressed at most once. cache_size holds the bytes of all entries.
+    file_cache = OrderedDict()
+    file_cache_lock = threading.Lock()
+    cache_size = 0
+
+    def entry_size(entry):
+        return len(entry[1]) + len(entry[2] or b'')
+
+    def evict():
+        """Drop least recently served entries down to _FILE_CACHE_MAX_BYTES; holds the lock."""
+        nonlocal cache_size
+        while cache_size > _FILE_CACHE_MAX_BYTES:
+            _, evicted = file_cache.popitem(last=False)
+            cache_size -= entry_size(evicted)
+
+    def read_cached(target, compressed=False):
+        nonlocal cache_size
+        st = target.stat()
+        version = (st.st_mtime_ns, st.st_size)
+        if st.st_size > _FILE_CACHE_MAX_BYTES:
+            content = target.read_bytes()
+            return gzip.compress(content, mtime=0) if compressed else content
+        key = str(target)
+        with file_cache_lock:
+            cached = file_cache.get(key)
+            if cached is not None:
+                file_cache.move_to_end(key)
+        if cached is None or cached[0] != version:
+            cached = [version, target.read_bytes(), None]
+            with file_cache_lock:
+                old = file_cache.pop(key, None)
+                if old is not None:
+                    cache_size -= entry_size(old)
+                file_cache[key] = cached
+                cache_size += len(cached[1])
+                evict()
+        if not compressed:
+            return cached[1]
+        if cached[2] is None:
+            gz = gzip.compress(cached[1], mtime=0)
+            with file_cache_lock:
+                # Another request may have replaced or evicted the entry meanwhile
+                if cached[2] is None and file_cache.get(key) is cached:
+                    cached[2] = gz
+                    cache_size += len(gz)
+                    evict()
+            return gz
+        return cached[2]
+
+    # The viewer sends the same analysis root with every file request;
+    # resolving it walks (lstat) each of its path components.
+    @functools.lru_cache(maxsize=64)
+    def resolve_root(root_path):
+        return Path(root_path).resolve()
+
+    # Encoded response body with the merged patterns, keyed by every
+    # contributing file's (path, prefix, mtime_ns, size), so an edited or
+    # added .clocignore changes the key. A hit is written out as is.
+    @functools.lru_cache(maxsize=16)
+    def merged_clocignore_response(sources):
+        # One joined block per file: a prefix is put in front of every line
+        # by the join separator instead of formatting each line on its own
+        blocks = []
+        for file_path, prefix, _, _ in sources:
+            lines = _PATTERN_LINE.findall(_read_text(file_path))
+            if not lines:
+                continue
+            if prefix:
+                blocks.append(f'{prefix}/' + f'\n{prefix}/'.join(lines))
+            else:
+                blocks.append('\n'.join(lines))
+        return dump_json_bytes({'content': '\n'.join(blocks)})
+
     class AinaRequestHandler(http.server.SimpleHTTPRequestHandler):
+        # Buffer the response stream: headers and a small body then leave in
+        # one send when the request finishes, instead of one per write.
+        wbufsize = -1
+
         def __init__(self, *args, **kwargs):
             super().__init__(*args, directory=str(frontend_dir), **kwargs)
 
@@ -49,19 +143,24 @@ def create_request_handler(frontend_dir, analysis_dir):
 
             target = analysis_dir / file_path
 
-            if not target.exists():
+            try:
+                compressed = (
+                    _accepts_gzip(self.headers.get('Accept-Encoding', ''))
+                    and target.stat().st_size >= _GZIP_MIN_SIZE
+                )
+                content = read_cached(target, compressed)
+            except FileNotFoundError:
                 self.send_error(404, 'Not found')
                 return
-
-            try:
-                content = target.read_text()
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(content.encode())
             except Exception as e:
                 self.send_error(500, f'Error reading file: {e}')
+                return
+
+            # Vary on every negotiated response, including uncompressed ones, so
+            # a shared cache does not hand a stored identity body to a client
+            # that asked for gzip, or the reverse
+            self.send_json(content, content_encoding='gzip' if compressed else None,
+                           vary='Accept-Encoding')
 
         def handle_file(self, query):
             """Serve file content with path validation and truncation for large files."""
@@ -74,7 +173,9 @@ def create_request_handler(frontend_dir, analysis_dir):
                 self.send_json_error(400, 'Missing path or root parameter')
                 return
 
-            resolved_root = Path(root_path).resolve()
+            resolved_root = resolve_root(root_path)
+            # Resolved rather than normalized, so symlinks that point out of
+            # the root are caught by the containment check below
             resolved_file = (resolved_root / file_path).resolve()
 
             if not str(resolved_file).startswith(str(resolved_root) + '/'):
@@ -91,16 +192,24 @@ def create_request_handler(frontend_dir, analysis_dir):
                 return
 
             try:
+                truncated = False
                 with resolved_file.open('r', encoding=encoding) as f:
                     lines = []
-                    total_lines = 0
                     for line in f:
-                        total_lines += 1
-                        if len(lines) < MAX_LINES:
-                            lines.append(line)
+                        if len(lines) == MAX_LINES:
+                            truncated = True
+                            break
+                        lines.append(line)
+                    total_lines = len(lines)
+                    if truncated:
+                        # The rest is only counted: as bytes where newlines
+                        # are single bytes, rather than decoded line by line
+                        if encoding.startswith('utf-16'):
+                            total_lines += 1 + sum(1 for _ in f)
+                        else:
+                            total_lines = count_lines(resolved_file)
 
                 content = ''.join(lines)
-                truncated = total_lines > MAX_LINES
                 response = {
                     'content': content,
                     'path': file_path,
@@ -109,11 +218,7 @@ def create_request_handler(frontend_dir, analysis_dir):
                     'displayedLines': len(lines)
                 }
 
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps(response).encode())
+                self.send_json(response)
             except Exception as e:
                 self.send_json_error(500, f'Error reading file: {e}')
 
@@ -127,58 +232,64 @@ def create_request_handler(frontend_dir, analysis_dir):
 
             analysis_path = analysis_dir / f'{analysis_name}.json'
             if not analysis_path.exists():
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({'error': 'Analysis not found', 'content': ''}).encode())
+                self.send_json({'error': 'Analysis not found', 'content': ''})
                 return
 
             try:
-                analysis_json = json.loads(analysis_path.read_text())
-                root_path = Path(analysis_json['root_path'])
-
-                all_patterns = []
+                # root_path precedes the (large) tree, so only the head of
+                # the file is parsed
+                fields = read_json_fields(analysis_path, ('root_path',))
+                root_path = Path(fields['root_path'])
 
                 if not root_path.exists():
-                    self.send_response(200)
-                    self.send_header('Content-Type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({'content': ''}).encode())
+                    self.send_json({'content': ''})
                     return
 
-                def add_patterns_from(file_path, prefix=''):
-                    if file_path.exists():
-                        for line in file_path.read_text().split('\n'):
-                            line = line.strip()
-                            if line and not line.startswith('#'):
-                                if prefix:
-                                    all_patterns.append(f'{prefix}/{line}')
-                                else:
-                                    all_patterns.append(line)
-
-                add_patterns_from(root_path / '.clocignore')
-
-                for entry in root_path.iterdir():
-                    if entry.is_dir() and not entry.name.startswith('.'):
-                        add_patterns_from(entry / '.clocignore', entry.name)
-
-                content = '\n'.join(all_patterns)
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({'content': content}).encode())
+                candidates = [(os.path.join(root_path, '.clocignore'), '')]
+                # DirEntry.is_dir() answers from the directory listing (only
+                # symlinks need a stat), unlike Path.is_dir() per entry
+                with os.scandir(root_path) as entries:
+                    for entry in entries:
+                        if not entry.name.startswith('.') and entry.is_dir():
+                            candidates.append((os.path.join(entry.path, '.clocignore'), entry.name))
+
+                sources = []
+                for file_path, prefix in candidates:
+                    try:
+                        st = os.stat(file_path)
+                    except (FileNotFoundError, NotADirectoryError):
+                        continue
+                    sources.append((file_path, prefix, st.st_mtime_ns, st.st_size))
+
+                self.send_json(merged_clocignore_response(tuple(sources)))
             except Exception as e:
                 self.send_json_error(500, f'Error reading clocignore: {e}')
 
-        def send_json_error(self, code, message):
-            """Send JSON error response."""
+        def send_json(self, data, code=200, content_encoding=None, vary=None):
+            """Send a JSON response.
+
+            Args:
+                data: JSON-serializable value, or already encoded JSON bytes
+                code: HTTP status code
+                content_encoding: Content-Encoding the bytes are already in
+                vary: Request headers the response was negotiated on
+            """
+            body = data if isinstance(data, bytes) else dump_json_bytes(data)
             self.send_response(code)
             self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            if content_encoding:
+                self.send_header('Content-Encoding', content_encoding)
+            if vary:
+                self.send_header('Vary', vary)
+            if code == 200:
+                self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
-            self.wfile.write(json.dumps({'error': message}).encode())
+            self.wfile.write(body)
+
+        def send_json_error(self, code, message):
+            """Send JSON error response."""
+            self.send_json({'error': message}, code)
 
         def log_message(self, format, *args):
             """Suppress default logging."""
@@ -187,6 +298,50 @@ def create_request_handler(frontend_dir, analysis_dir):
     return AinaRequestHandler
 
 
+class _AinaServer(http.server.ThreadingHTTPServer):
+    """Threaded HTTP server with room for a browser's burst of connections.
+
+    Each request gets its own (daemon) thread. The listen backlog is raised
+    from socketserver's default of 5, which a page load opening many
+    parallel asset connections can overflow, stalling the excess ones
+    until the client retries.
+    """
+
+    request_queue_size = 64
+
+
+def _accepts_gzip(accept_encoding):
+    """Whether an Accept-Encoding header value allows a gzip response."""
+    for coding in accept_encoding.split(','):
+        name, _, params = coding.partition(';')
+        if name.strip().lower() in ('gzip', 'x-gzip'):
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def _read_text(path):
+    """Read a small UTF-8 text file with plain os-level calls.
+
+    One open, one fstat and (normally) one read: no buffered reader and its
+    extra seek/isatty syscalls, which dominate for files of a few lines.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        str: File content; undecodable bytes are replaced
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        chunks = [os.read(fd, os.fstat(fd).st_size + 1)]
+        while chunks[-1]:
+            # Grew since fstat (or reports no size); read to the end
+            chunks.append(os.read(fd, 65536))
+    finally:
+        os.close(fd)
+    return b''.join(chunks).decode('utf-8', 'replace')
+
+
 def _get_git_head(repo_path):
     """Get the current HEAD commit hash.
 
@@ -392,12 +547,11 @@ def cmd_show(port=8080, no_browser=False):
         if is_behind:
             print(f"Note: {commits_behind} update(s) available. Run 'git pull' and restart to get latest features.")
 
-        analysis_dir = Path.home() / '.aina' / 'analysis'
-        analysis_dir.mkdir(parents=True, exist_ok=True)
-
-        handler = create_request_handler(frontend_dir, analysis_dir)
+        handler = create_request_handler(frontend_dir, get_analysis_dir(create=True))
 
-        with socketserver.TCPServer(('', port), handler) as httpd:
+        # One thread per request, so a large analysis download does not hold
+        # up the index or file requests of other tabs
+        with _AinaServer(('', port), handler) as httpd:
             url = f'http://localhost:{port}'
             print(f'Serving at {url}')
             print('Press Ctrl+C to stop')
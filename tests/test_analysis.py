@@ -0,0 +1,252 @@
+"""Tests for analysis helpers (cloc parsing, tree building, index generation)."""
+import os
+import unittest
+import subprocess
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aina_lib import analysis
+from aina_lib import run_cloc, build_directory_tree, tree_to_schema, generate_analysis_index
+from aina_lib.file_utils import read_json, write_json
+
+
+def completed(stdout=b'', stderr=b'', returncode=0):
+    """Build a CompletedProcess carrying raw bytes, as run_cloc captures them."""
+    return subprocess.CompletedProcess(args=['cloc'], returncode=returncode, stdout=stdout, stderr=stderr)
+
+
+class TestRunCloc(unittest.TestCase):
+    """Test parsing of cloc output."""
+
+    def test_parses_json_output(self):
+        """Plain cloc JSON is parsed into a dict."""
+        output = b'{"header": {}, "/r/a.py": {"code": 3, "language": "Python"}, "SUM": {}}'
+        with patch.object(analysis.subprocess, 'run', return_value=completed(output)):
+            data = run_cloc('/r')
+
+        self.assertEqual(data['/r/a.py']['code'], 3)
+
+    def test_ignores_text_after_json(self):
+        """Warning text cloc appends after the JSON document is ignored."""
+        output = b'{"header": {}, "/r/a.py": {"code": 3}}\nWarning: something timed out\n'
+        with patch.object(analysis.subprocess, 'run', return_value=completed(output)):
+            data = run_cloc('/r')
+
+        self.assertEqual(data['/r/a.py']['code'], 3)
+
+    def test_runs_without_stdin_in_c_locale(self):
+        """cloc gets no stdin and runs with LC_ALL=C, keeping the rest of the environment."""
+        with patch.object(analysis.subprocess, 'run', return_value=completed(b'{}')) as run:
+            run_cloc('/repo')
+
+        kwargs = run.call_args.kwargs
+        self.assertIs(kwargs['stdin'], subprocess.DEVNULL)
+        self.assertEqual(kwargs['env']['LC_ALL'], 'C')
+        self.assertEqual(kwargs['env'].get('PATH'), analysis.os.environ.get('PATH'))
+
+    def test_timeout_falls_back_to_line_count(self):
+        """A file cloc timed out on is counted from stderr's report instead."""
+        with tempfile.NamedTemporaryFile('w', suffix='.ts', delete=False) as f:
+            f.write('a\nb\nc\n')
+        self.addCleanup(os.unlink, f.name)
+        stderr = f'Line count, exceeded timeout:  {f.name}\n'.encode()
+
+        real_run = subprocess.run
+
+        def fake_run(cmd, **kwargs):
+            if cmd[0] == 'cloc':
+                return completed(b'{"header": {}}', stderr)
+            return real_run(cmd, **kwargs)
+
+        with patch.object(analysis.subprocess, 'run', side_effect=fake_run):
+            result = run_cloc('/repo')
+
+        self.assertEqual(result[f.name], {'blank': 0, 'comment': 0, 'code': 3, 'language': 'TypeScript'})
+
+    def test_empty_output_raises(self):
+        """No output at all is reported as an error."""
+        with patch.object(analysis.subprocess, 'run', return_value=completed(b'\n', b'boom')):
+            with self.assertRaises(RuntimeError):
+                run_cloc('/r')
+
+    def test_invalid_json_raises(self):
+        """Output that is not JSON is reported as an error."""
+        with patch.object(analysis.subprocess, 'run', return_value=completed(b'not json')):
+            with self.assertRaises(RuntimeError):
+                run_cloc('/r')
+
+
+class TestTreeToSchema(unittest.TestCase):
+    """Test conversion of cloc file lists into schema trees."""
+
+    FILES = {
+        '/r/src/b/m.py': {'code': 2, 'language': 'Python'},
+        '/r/src/b-x/n.py': {'code': 1, 'language': 'Python'},
+        '/r/src/a.py': {'code': 3, 'language': 'Python'},
+        '/r/README.md': {'code': 4, 'language': 'Markdown'},
+        '/elsewhere/x.py': {'code': 9, 'language': 'Python'},
+    }
+
+    def test_builds_sorted_schema_with_prefixed_paths(self):
+        """Directories come before files, each sorted by name, with prefixed paths."""
+        tree = build_directory_tree(self.FILES, '/r')
+        node = tree_to_schema(tree['_dirs']['src'], 'src', 'repo')
+
+        self.assertEqual(node['path'], 'repo/src')
+        self.assertEqual([c['name'] for c in node['children']], ['b', 'b-x', 'a.py'])
+        self.assertEqual(node['children'][0]['children'][0]['path'], 'repo/src/b/m.py')
+        self.assertEqual(node['children'][2], {
+            'name': 'a.py', 'type': 'file', 'path': 'repo/src/a.py',
+            'value': 3, 'language': 'Python', 'extension': '.py'
+        })
+
+    def test_handles_trees_deeper_than_recursion_limit(self):
+        """Conversion does not recurse per directory level."""
+        depth = sys.getrecursionlimit() + 100
+        deep_file = '/r/' + '/'.join(['d'] * depth) + '/leaf.py'
+        tree = build_directory_tree({deep_file: {'code': 1}}, '/r')
+
+        node = tree_to_schema(tree['_dirs']['d'], 'd', 'repo')
+
+        for _ in range(depth - 1):
+            node = node['children'][0]
+        self.assertEqual(node['children'][0]['path'], 'repo/' + '/'.join(['d'] * depth) + '/leaf.py')
+
+    def test_skips_files_outside_base(self):
+        """Files not under the base path are left out of the tree."""
+        tree = build_directory_tree(self.FILES, '/r')
+
+        self.assertEqual(sorted(tree['_dirs']), ['src'])
+        self.assertEqual([f['name'] for f in tree['_files']], ['README.md'])
+
+    def test_tallies_languages_of_files_in_tree(self):
+        """Lines per language are counted for the files that go into the tree."""
+        from collections import Counter
+        languages = Counter()
+
+        build_directory_tree(self.FILES, '/r', languages)
+
+        self.assertEqual(languages, Counter({'Python': 6, 'Markdown': 4}))
+
+    def test_matches_pathlib_for_unusual_spellings(self):
+        """Paths that are not a plain prefix match resolve like Path.relative_to would."""
+        files = {
+            '/r//src/a.py': {'code': 1},
+            '/r/./src/b.tar.gz': {'code': 1},
+            '/r/.bashrc': {'code': 1},
+            '/r/Makefile': {'code': 1},
+        }
+        tree = build_directory_tree(files, '/r/')
+
+        self.assertEqual([f['path'] for f in tree['_dirs']['src']['_files']], ['src/a.py', 'src/b.tar.gz'])
+        self.assertEqual([f['extension'] for f in tree['_dirs']['src']['_files']], ['.py', '.gz'])
+        self.assertEqual([(f['name'], f['extension']) for f in tree['_files']], [('.bashrc', ''), ('Makefile', '')])
+
+    def test_attaches_git_stats_by_relative_path(self):
+        """Git stats are looked up by repo-relative path."""
+        tree = build_directory_tree(self.FILES, '/r')
+        git_stats = {'src/a.py': {'commits_3m': 1, 'commits_1y': 2, 'last_commit_date': 'd'}}
+        node = tree_to_schema(tree['_dirs']['src'], 'src', 'repo', git_stats)
+
+        a_node = node['children'][2]
+        self.assertEqual(a_node['commits'], {'last_3_months': 1, 'last_year': 2, 'last_commit_date': 'd'})
+        m_node = node['children'][0]['children'][0]
+        self.assertEqual(m_node['commits']['last_year'], 0)
+
+
+class TestGenerateAnalysisIndex(unittest.TestCase):
+    """Test index.json generation from analysis files."""
+
+    def setUp(self):
+        self.home = Path(tempfile.mkdtemp())
+        self.analysis_dir = self.home / '.aina' / 'analysis'
+        self.analysis_dir.mkdir(parents=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.home)
+
+    def generate(self):
+        with patch.object(analysis.Path, 'home', return_value=self.home):
+            self.assertTrue(generate_analysis_index())
+        return read_json(self.analysis_dir / 'index.json')
+
+    def test_lists_analyses_sorted_by_name(self):
+        """Every analysis file gets an entry carrying its metadata, sorted by name."""
+        for name in ['zeta', 'alpha']:
+            write_json(self.analysis_dir / f'{name}.json', {
+                'analysis_set': name,
+                'generated_at': '2025-01-01T00:00:00Z',
+                'stats': {'total_files': 1},
+                'tree': {'name': name, 'children': []}
+            })
+
+        index = self.generate()
+
+        self.assertEqual([a['name'] for a in index['analyses']], ['alpha', 'zeta'])
+        self.assertEqual(index['analyses'][0], {
+            'name': 'alpha',
+            'filename': 'alpha.json',
+            'generated_at': '2025-01-01T00:00:00Z',
+            'stats': {'total_files': 1}
+        })
+
+    def test_updated_at_is_utc_iso_timestamp(self):
+        """The index is stamped with a second-precision UTC time."""
+        index = self.generate()
+
+        self.assertRegex(index['updated_at'], r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z$')
+
+    def test_skips_unreadable_files(self):
+        """A corrupt analysis file is left out instead of failing the index."""
+        write_json(self.analysis_dir / 'good.json', {'analysis_set': 'good', 'stats': {}})
+        (self.analysis_dir / 'bad.json').write_text('{not json')
+
+        index = self.generate()
+
+        self.assertEqual([a['name'] for a in index['analyses']], ['good'])
+
+    def test_reuses_entries_of_unchanged_files(self):
+        """Only analysis files changed since the last run are read again."""
+        write_json(self.analysis_dir / 'a.json', {'analysis_set': 'a', 'stats': {'total_files': 1}})
+        write_json(self.analysis_dir / 'b.json', {'analysis_set': 'b', 'stats': {'total_files': 1}})
+        self.generate()
+
+        write_json(self.analysis_dir / 'b.json', {'analysis_set': 'b', 'stats': {'total_files': 22}})
+        with patch.object(analysis, '_load_index_entry', wraps=analysis._load_index_entry) as load:
+            index = self.generate()
+
+        self.assertEqual([c.args[0].name for c in load.call_args_list], ['b.json'])
+        self.assertEqual([a['stats']['total_files'] for a in index['analyses']], [1, 22])
+
+    def test_leaves_cache_alone_when_nothing_changed(self):
+        """The sidecar cache is only rewritten when an entry changes."""
+        write_json(self.analysis_dir / 'a.json', {'analysis_set': 'a', 'stats': {}})
+        self.generate()
+        cache_path = self.analysis_dir / analysis._INDEX_CACHE_NAME
+        cached_at = cache_path.stat().st_mtime_ns
+
+        with patch.object(analysis, 'write_json', wraps=analysis.write_json) as write:
+            self.generate()
+
+        self.assertEqual([c.args[0].name for c in write.call_args_list], ['index.json'])
+        self.assertEqual(cache_path.stat().st_mtime_ns, cached_at)
+
+    def test_drops_entries_of_removed_files(self):
+        """A removed analysis disappears from the index even though it was cached."""
+        write_json(self.analysis_dir / 'a.json', {'analysis_set': 'a', 'stats': {}})
+        write_json(self.analysis_dir / 'b.json', {'analysis_set': 'b', 'stats': {}})
+        self.generate()
+
+        (self.analysis_dir / 'a.json').unlink()
+        index = self.generate()
+
+        self.assertEqual([a['name'] for a in index['analyses']], ['b'])
+
+
+if __name__ == '__main__':
+    unittest.main()
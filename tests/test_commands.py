@@ -22,7 +22,9 @@ class TestCmdAdd(unittest.TestCase):
     def tearDown(self):
         """Clean up temporary files."""
         os.close(self.db_fd)
-        os.unlink(self.db_path)
+        for path in (self.db_path, self.db_path + '-wal', self.db_path + '-shm'):
+            if os.path.exists(path):
+                os.unlink(path)
         import shutil
         shutil.rmtree(self.temp_dir)
 
@@ -68,7 +70,9 @@ class TestCmdList(unittest.TestCase):
     def tearDown(self):
         """Clean up temporary files."""
         os.close(self.db_fd)
-        os.unlink(self.db_path)
+        for path in (self.db_path, self.db_path + '-wal', self.db_path + '-shm'):
+            if os.path.exists(path):
+                os.unlink(path)
         import shutil
         shutil.rmtree(self.temp_dir)
 
@@ -100,7 +104,9 @@ class TestCmdRemove(unittest.TestCase):
     def tearDown(self):
         """Clean up temporary files."""
         os.close(self.db_fd)
-        os.unlink(self.db_path)
+        for path in (self.db_path, self.db_path + '-wal', self.db_path + '-shm'):
+            if os.path.exists(path):
+                os.unlink(path)
         import shutil
         shutil.rmtree(self.temp_dir)
 
@@ -137,7 +143,9 @@ class TestCmdAnalyzeAll(unittest.TestCase):
     def tearDown(self):
         """Clean up temporary files."""
         os.close(self.db_fd)
-        os.unlink(self.db_path)
+        for path in (self.db_path, self.db_path + '-wal', self.db_path + '-shm'):
+            if os.path.exists(path):
+                os.unlink(path)
         import shutil
         shutil.rmtree(self.temp_dir)
 
@@ -166,7 +174,7 @@ class TestCmdAnalyzeAll(unittest.TestCase):
             'stats': {'total_repos': 1, 'total_files': 10, 'total_lines': 100}
         }
 
-        with patch('aina_lib.cli.analyze_repos', return_value=mock_result):
+        with patch('aina_lib.analysis.analyze_repos', return_value=mock_result):
             result = _analyze_all(self.db_path, quiet=True)
 
         self.assertTrue(result)
@@ -188,12 +196,187 @@ class TestCmdAnalyzeAll(unittest.TestCase):
             'stats': {'total_repos': 1, 'total_files': 10, 'total_lines': 100}
         }
 
-        with patch('aina_lib.cli.analyze_repos', return_value=mock_result):
+        with patch('aina_lib.analysis.analyze_repos', return_value=mock_result):
             result = _analyze_all(self.db_path, quiet=True)
 
         # Should return False because one failed
         self.assertFalse(result)
 
 
+    def test_analyze_all_skips_index_when_every_set_fails(self):
+        """Test the index is only regenerated when an analysis file was written."""
+        from aina_lib.cli import _analyze_all
+        from aina_lib import Database
+        from unittest.mock import patch
+
+        database = Database(self.db_path)
+        database.add_analysis_set('bad-set', '/nonexistent/path')
+
+        with patch('aina_lib.analysis.generate_analysis_index') as generate:
+            result = _analyze_all(self.db_path, quiet=True)
+
+        self.assertFalse(result)
+        generate.assert_not_called()
+
+    def test_quiet_analyze_all_runs_sets_concurrently(self):
+        """Test quiet --all analyzes sets side by side and reports them in order."""
+        import io
+        import threading
+        from contextlib import redirect_stdout
+        from aina_lib.cli import _analyze_all
+        from aina_lib import Database
+        from unittest.mock import patch
+
+        database = Database(self.db_path)
+        database.add_analysis_set('set1', self.temp_dir)
+        database.add_analysis_set('set2', self.temp_dir)
+        both_running = threading.Barrier(2, timeout=5)
+
+        share = []
+
+        def fake_analysis(name, path, **kwargs):
+            share.append(kwargs['concurrent_sets'])
+            both_running.wait()
+            return True, {'total_repos': 1, 'total_files': int(name[-1]), 'total_lines': 1}
+
+        output = io.StringIO()
+        with patch('aina_lib.cli._run_single_analysis', side_effect=fake_analysis), \
+                patch('aina_lib.analysis.generate_analysis_index'), redirect_stdout(output):
+            result = _analyze_all(self.db_path, quiet=True)
+
+        self.assertTrue(result)
+        rows = [line.split()[0] for line in output.getvalue().splitlines() if line.startswith('  set')]
+        self.assertEqual(rows, ['set1', 'set2'])
+        # Each set knows it shares the worker threads with the other
+        self.assertEqual(share, [2, 2])
+
+
+class TestCmdAnalyze(unittest.TestCase):
+    """Test analyzing a single set."""
+
+    def setUp(self):
+        """Create temporary database and directories for testing."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up temporary files."""
+        os.close(self.db_fd)
+        for path in (self.db_path, self.db_path + '-wal', self.db_path + '-shm'):
+            if os.path.exists(path):
+                os.unlink(path)
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def test_registers_set_without_holding_lock_during_analysis(self):
+        """Test a new set is registered and the database stays writable while analyzing."""
+        from aina_lib import cmd_analyze, Database
+        from unittest.mock import patch
+
+        def fake_analysis(name, path, **kwargs):
+            with Database(self.db_path) as other:
+                other.add_analysis_set('other', path)
+            return True, {}
+
+        with patch('aina_lib.cli._run_single_analysis', side_effect=fake_analysis), \
+                patch('aina_lib.analysis.generate_analysis_index'):
+            result = cmd_analyze('new-set', self.temp_dir, self.db_path)
+
+        self.assertTrue(result)
+        with Database(self.db_path) as database:
+            names = [s['name'] for s in database.list_analysis_sets()]
+        self.assertEqual(names, ['new-set', 'other'])
+
+
+class TestRunSingleAnalysis(unittest.TestCase):
+    """Test writing the analysis file."""
+
+    def setUp(self):
+        self.home = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.home)
+
+    def test_writes_compact_analysis_file(self):
+        """Test the analysis is written as compact JSON that reads back unchanged."""
+        from aina_lib.cli import _run_single_analysis
+        from aina_lib.file_utils import read_json
+        from unittest.mock import patch
+
+        analysis_json = {
+            'analysis_set': 'set1',
+            'stats': {'total_repos': 1, 'total_files': 1, 'total_lines': 3},
+            'tree': {'name': 'set1', 'type': 'analysis_set', 'children': [
+                {'name': 'r', 'type': 'repository', 'path': 'r', 'children': [
+                    {'name': 'å.py', 'type': 'file', 'path': 'r/å.py', 'value': 3}
+                ]}
+            ]}
+        }
+
+        with patch('aina_lib.analysis.analyze_repos', return_value=analysis_json), \
+                patch('aina_lib.cli.Path.home', return_value=self.home):
+            success, stats = _run_single_analysis('set1', str(self.home), interactive=False, quiet=True)
+
+        output_path = self.home / '.aina' / 'analysis' / 'set1.json'
+        self.assertTrue(success)
+        self.assertEqual(stats, analysis_json['stats'])
+        self.assertEqual(read_json(output_path), analysis_json)
+        self.assertNotIn(b'\n', output_path.read_bytes())
+        self.assertNotIn(b', ', output_path.read_bytes())
+
+
+class TestCliStartup(unittest.TestCase):
+    """Test that light commands don't load heavy modules."""
+
+    def test_cli_commands_do_not_import_server(self):
+        """Importing the CLI commands leaves the HTTP server stack unloaded."""
+        import subprocess
+        code = (
+            "import sys\n"
+            f"sys.path.insert(0, {str(Path(__file__).parent.parent)!r})\n"
+            "from aina_lib import cmd_add, cmd_list, cmd_remove, cmd_analyze\n"
+            "print(sorted(m for m in ('aina_lib.server', 'http.server') if m in sys.modules))\n"
+        )
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+
+        self.assertEqual(result.stdout.strip(), '[]')
+
+    def test_cli_commands_do_not_import_analysis(self):
+        """Importing the CLI commands leaves the analysis pipeline unloaded."""
+        import subprocess
+        code = (
+            "import sys\n"
+            f"sys.path.insert(0, {str(Path(__file__).parent.parent)!r})\n"
+            "from aina_lib import cmd_add, cmd_list, cmd_remove, cmd_analyze\n"
+            "print(sorted(m for m in ('aina_lib.analysis', 'aina_lib.git_stats') if m in sys.modules))\n"
+        )
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+
+        self.assertEqual(result.stdout.strip(), '[]')
+
+
+class TestCmdAnalyzeSignature(unittest.TestCase):
+    """Test that cmd_analyze keeps the interface the aina script calls."""
+
+    def test_parameters(self):
+        """cmd_analyze accepts the --all, --yes, --quiet and --no-cache options."""
+        import inspect
+        from aina_lib import cmd_analyze
+        from aina_lib.cli import cmd_analyze as cli_cmd_analyze
+
+        params = inspect.signature(cmd_analyze).parameters
+
+        self.assertIs(cmd_analyze, cli_cmd_analyze)
+        self.assertEqual(
+            list(params),
+            ['name', 'path', 'db_path', 'all_sets', 'yes', 'quiet', 'use_cache']
+        )
+        self.assertEqual(
+            {name: p.default for name, p in params.items() if p.default is not p.empty},
+            {'all_sets': False, 'yes': False, 'quiet': False, 'use_cache': True}
+        )
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -8,7 +8,8 @@ from pathlib import Path
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from aina_lib import Database
+from aina_lib import Database, FileStatsCache
+from aina_lib import database as database_module
 
 
 class DatabaseTestCase(unittest.TestCase):
@@ -23,7 +24,9 @@ class DatabaseTestCase(unittest.TestCase):
         if hasattr(self, 'conn') and self.conn:
             self.conn.close()
         os.close(self.db_fd)
-        os.unlink(self.db_path)
+        for path in (self.db_path, self.db_path + '-wal', self.db_path + '-shm'):
+            if os.path.exists(path):
+                os.unlink(path)
 
 
 class TestDatabaseInit(DatabaseTestCase):
@@ -55,6 +58,79 @@ class TestDatabaseInit(DatabaseTestCase):
             self.assertIn('path', columns)
             self.assertIn('created_at', columns)
 
+    def test_each_memory_database_gets_schema(self):
+        """Test that a second in-memory database is usable after a first."""
+        for _ in range(2):
+            with Database(':memory:') as database:
+                database.add_analysis_set('set', '/path')
+                self.assertEqual(database.get_analysis_set('set')['path'], '/path')
+
+    def test_recreated_database_file_gets_schema(self):
+        """Test that a database file deleted and recreated at the same path is usable."""
+        Database(self.db_path).close()
+        for path in (self.db_path, self.db_path + '-wal', self.db_path + '-shm'):
+            if os.path.exists(path):
+                os.unlink(path)
+
+        with Database(self.db_path) as database:
+            self.assertEqual(database.list_analysis_sets(), [])
+
+    def test_uses_wal_journal_mode(self):
+        """Test that the shared connection runs in WAL mode."""
+        with Database(self.db_path) as database:
+            mode = database._connect().execute("PRAGMA journal_mode").fetchone()[0]
+
+        self.assertEqual(mode, 'wal')
+
+    def test_operations_reuse_one_connection(self):
+        """Test that method calls don't open further connections."""
+        from unittest.mock import patch
+
+        with Database(self.db_path) as database:
+            with patch.object(sqlite3, 'connect') as connect:
+                database.add_analysis_set('test-set', '/path/to/repos')
+                database.get_analysis_set('test-set')
+                database.list_analysis_sets()
+                database.remove_analysis_set('test-set')
+
+        connect.assert_not_called()
+
+    def test_transaction_excludes_other_threads(self):
+        """Test another thread's statements wait until an open transaction ends."""
+        import threading
+
+        with Database(self.db_path) as database:
+            with database.transaction('IMMEDIATE'):
+                worker = threading.Thread(target=database.add_analysis_set, args=('other', '/p'))
+                worker.start()
+                worker.join(0.2)
+                self.assertTrue(worker.is_alive())
+                database.add_analysis_set('mine', '/p')
+            worker.join(5)
+
+            names = [s['name'] for s in database.list_analysis_sets()]
+
+        self.assertEqual(names, ['mine', 'other'])
+
+    def test_close_runs_optimize(self):
+        """Test that closing lets SQLite refresh planner statistics."""
+        database = Database(self.db_path)
+        statements = []
+        database._connect().set_trace_callback(statements.append)
+
+        database.close()
+
+        self.assertIn('PRAGMA optimize', statements)
+
+    def test_queries_use_covering_index(self):
+        """Test that lookup and listing are answered from the index alone."""
+        with Database(self.db_path) as database:
+            conn = database._connect()
+            lookup = conn.execute("EXPLAIN QUERY PLAN " + database_module._SQL_GET_BY_NAME, ('x',)).fetchall()
+            listing = conn.execute("EXPLAIN QUERY PLAN " + database_module._SQL_LIST).fetchall()
+
+        self.assertIn('SEARCH analysis_sets USING COVERING INDEX idx_sets_name_path', lookup[0][-1])
+        self.assertIn('SCAN analysis_sets USING COVERING INDEX idx_sets_name_path', listing[0][-1])
 
 
 class TestAddAnalysisSet(DatabaseTestCase):
@@ -85,6 +161,43 @@ class TestAddAnalysisSet(DatabaseTestCase):
         with self.assertRaises(sqlite3.IntegrityError):
             self.database.add_analysis_set('test-set', '/different/path')
 
+    def test_add_analysis_sets_inserts_all_rows(self):
+        """Test bulk insert adds every row."""
+        self.database.add_analysis_sets([('set1', '/path/one'), ('set2', '/path/two')])
+
+        names = [s['name'] for s in self.database.list_analysis_sets()]
+        self.assertEqual(names, ['set1', 'set2'])
+
+    def test_add_analysis_sets_commits_large_batch_once(self):
+        """Test a bulk insert streamed from a generator is one transaction."""
+        statements = []
+        self.database._connect().set_trace_callback(statements.append)
+
+        self.database.add_analysis_sets((f'set{i:05}', f'/path/{i}') for i in range(10_000))
+
+        self.database._connect().set_trace_callback(None)
+        self.assertEqual(statements.count('COMMIT'), 1)
+        self.assertEqual(len(self.database.list_analysis_sets()), 10_000)
+
+    def test_add_joins_callers_transaction(self):
+        """Test that an add inside an open transaction is rolled back with it."""
+        with self.assertRaises(RuntimeError):
+            with self.database.transaction('IMMEDIATE'):
+                self.database.add_analysis_set('test-set', '/path/to/repos')
+                raise RuntimeError('abort')
+
+        self.assertEqual(self.database.list_analysis_sets(), [])
+
+    def test_add_analysis_sets_is_all_or_nothing(self):
+        """Test a duplicate in a bulk insert rolls back the whole batch."""
+        self.database.add_analysis_set('existing', '/path/existing')
+
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.database.add_analysis_sets([('new', '/path/new'), ('existing', '/other')])
+
+        names = [s['name'] for s in self.database.list_analysis_sets()]
+        self.assertEqual(names, ['existing'])
+
 
 class TestListAnalysisSets(DatabaseTestCase):
     """Test listing analysis sets."""
@@ -146,5 +259,69 @@ class TestRemoveAnalysisSet(DatabaseTestCase):
         self.assertTrue(result)
 
 
+class TestGetAnalysisSet(DatabaseTestCase):
+    """Test looking up analysis sets by name."""
+
+    def setUp(self):
+        """Create temporary database for testing."""
+        super().setUp()
+        self.database = Database(self.db_path)
+
+    def test_get_existing_set(self):
+        """Test that the row supports access by column name and position."""
+        self.database.add_analysis_set('test-set', '/path/to/repos')
+
+        row = self.database.get_analysis_set('test-set')
+
+        self.assertEqual(row['name'], 'test-set')
+        self.assertEqual(row['path'], '/path/to/repos')
+        self.assertEqual(tuple(row), ('test-set', '/path/to/repos'))
+
+    def test_get_nonexistent_set(self):
+        """Test that an unknown name returns None."""
+        self.assertIsNone(self.database.get_analysis_set('nonexistent'))
+
+
+class TestFileStatsCache(DatabaseTestCase):
+    """Test the git file stats cache table."""
+
+    def setUp(self):
+        """Create temporary database for testing."""
+        super().setUp()
+        self.database = Database(self.db_path)
+
+    def tearDown(self):
+        self.database.close()
+        super().tearDown()
+
+    def test_round_trip(self):
+        """Test that stored stats come back for the same repo and commit only."""
+        cache = FileStatsCache(self.database)
+        stats = {'a.py': {'commits_1y': 2, 'contributors': {'count': 1, 'names': ['Ann']}}}
+
+        cache.put('/repo', 'abc', stats)
+
+        self.assertEqual(cache.get('/repo', 'abc'), stats)
+        self.assertIsNone(cache.get('/repo', 'def'))
+        self.assertIsNone(cache.get('/other', 'abc'))
+
+    def test_expired_entries_are_ignored(self):
+        """Test that entries older than max_age are treated as missing."""
+        FileStatsCache(self.database).put('/repo', 'abc', {})
+
+        self.assertIsNone(FileStatsCache(self.database, max_age=-1).get('/repo', 'abc'))
+
+    def test_keeps_most_recent_commits_per_repo(self):
+        """Test that only keep_per_repo commits are kept for each repository."""
+        cache = FileStatsCache(self.database, keep_per_repo=2)
+        for sha in ['c1', 'c2', 'c3']:
+            cache.put('/repo', sha, {'sha': sha})
+        cache.put('/other', 'c1', {})
+
+        self.assertIsNone(cache.get('/repo', 'c1'))
+        self.assertEqual(cache.get('/repo', 'c3'), {'sha': 'c3'})
+        self.assertEqual(cache.get('/other', 'c1'), {})
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -6,7 +6,10 @@ from pathlib import Path
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from aina_lib.file_utils import detect_file_encoding
+from aina_lib.file_utils import (
+    count_lines, detect_file_encoding, dump_json_bytes, ensure_dir, get_analysis_dir, read_json,
+    read_json_fields, write_json
+)
 
 
 class TestDetectFileEncoding(unittest.TestCase):
@@ -134,6 +137,52 @@ class TestDetectFileEncodingEdgeCases(unittest.TestCase):
         # Should detect as utf-8 (with or without -sig suffix)
         self.assertIn(encoding, ['utf-8', 'utf-8-sig'])
 
+    def test_utf16_with_bom(self):
+        """Test UTF-16 files are recognized by their byte order mark."""
+        path = Path(self.temp_dir) / 'utf16.txt'
+        path.write_bytes('\ufeffHei på deg'.encode('utf-16-le'))
+
+        encoding = detect_file_encoding(path)
+
+        self.assertEqual(encoding, 'utf-16le')
+        self.assertEqual(path.read_text(encoding=encoding), '\ufeffHei på deg')
+
+    def test_windows_1252_bytes_are_readable(self):
+        """Test 8-bit text outside Latin-1's printable range still decodes."""
+        path = Path(self.temp_dir) / 'cp1252.txt'
+        path.write_bytes('Price: 5€ – “quoted”'.encode('cp1252'))
+
+        encoding = detect_file_encoding(path)
+
+        self.assertEqual(encoding, 'iso-8859-1')
+        path.read_text(encoding=encoding)
+
+    def test_does_not_start_processes(self):
+        """Test detection happens in process."""
+        from unittest.mock import patch
+        import subprocess
+        path = Path(self.temp_dir) / 'utf8.txt'
+        path.write_text('Blåbær', encoding='utf-8')
+
+        with patch.object(subprocess, 'Popen', side_effect=AssertionError('process started')):
+            self.assertEqual(detect_file_encoding(path), 'utf-8')
+
+    def test_repeat_detection_of_unchanged_file_is_cached(self):
+        """Test an unchanged file is not read again, while an edited one is."""
+        from unittest.mock import patch
+        import builtins
+        import os
+        path = Path(self.temp_dir) / 'cached.txt'
+        path.write_bytes(b'plain')
+        self.assertEqual(detect_file_encoding(path), 'utf-8')
+
+        with patch.object(builtins, 'open', side_effect=AssertionError('file read again')):
+            self.assertEqual(detect_file_encoding(path), 'utf-8')
+
+        path.write_bytes(b'\x00\x01 now binary')
+        os.utime(path, ns=(0, 0))
+        self.assertIsNone(detect_file_encoding(path))
+
     def test_mixed_content_file(self):
         """Test file with mostly ASCII but some high bytes."""
         path = Path(self.temp_dir) / 'mixed.txt'
@@ -146,5 +195,173 @@ class TestDetectFileEncodingEdgeCases(unittest.TestCase):
         self.assertEqual(encoding, 'iso-8859-1')
 
 
+class TestJsonFiles(unittest.TestCase):
+    """Test JSON file reading and writing."""
+
+    def setUp(self):
+        """Create temporary directory for test files."""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip(self):
+        """Test that written data reads back unchanged, including non-ASCII text."""
+        path = Path(self.temp_dir) / 'data.json'
+        data = {'name': 'Blåbær', 'stats': {'total_files': 3}, 'pairs': [[1, 2]]}
+
+        write_json(path, data)
+
+        self.assertEqual(read_json(path), data)
+
+    def test_write_is_compact(self):
+        """Test that output has no indentation or separator padding."""
+        path = Path(self.temp_dir) / 'data.json'
+
+        write_json(path, {'a': [1, 2], 'b': None})
+
+        self.assertEqual(path.read_text(), '{"a":[1,2],"b":null}')
+
+    def test_ensure_dir_creates_once(self):
+        """Test that parents are created and repeat calls skip the filesystem."""
+        from unittest.mock import patch
+        path = Path(self.temp_dir) / 'a' / 'b'
+
+        self.assertEqual(ensure_dir(path), path)
+        self.assertTrue(path.is_dir())
+        with patch.object(Path, 'mkdir') as mkdir:
+            ensure_dir(path)
+        mkdir.assert_not_called()
+
+    def test_count_lines_matches_text_mode(self):
+        """Test that counts agree with text-mode iteration for every newline style."""
+        from unittest.mock import patch
+        from aina_lib import file_utils
+        path = Path(self.temp_dir) / 'lines.txt'
+        samples = [b'', b'a', b'a\n', b'a\nb', b'a\r\nb\r\n', b'a\rb\r', b'\n\n\r\r\n', b'x\r\n\xe5\n']
+
+        # A 2-byte chunk size also splits '\r\n' pairs across reads
+        for chunk_size in (2, 3, 1024):
+            for sample in samples:
+                path.write_bytes(sample)
+                with open(path, encoding='iso-8859-1') as f:
+                    expected = sum(1 for _ in f)
+                with patch.object(file_utils, '_COUNT_CHUNK_SIZE', chunk_size):
+                    self.assertEqual(count_lines(path), expected, (chunk_size, sample))
+
+    def test_get_analysis_dir_follows_home(self):
+        """Test that the directory is under the current home and only created on request."""
+        from unittest.mock import patch
+        home = Path(self.temp_dir)
+        expected = home / '.aina' / 'analysis'
+
+        with patch.object(Path, 'home', return_value=home):
+            self.assertEqual(get_analysis_dir(), expected)
+            self.assertFalse(expected.exists())
+            self.assertEqual(get_analysis_dir(create=True), expected)
+        self.assertTrue(expected.is_dir())
+
+    def test_dump_json_bytes_is_compact_ascii(self):
+        """Test that in-memory encoding matches the file output and escapes non-ASCII."""
+        path = Path(self.temp_dir) / 'data.json'
+        data = {'name': 'Blåbær', 'a': [1, 2]}
+        write_json(path, data)
+
+        body = dump_json_bytes(data)
+
+        self.assertEqual(body, b'{"name":"Bl\\u00e5b\\u00e6r","a":[1,2]}')
+        self.assertEqual(body, path.read_bytes())
+
+    def test_streamed_output_matches_one_shot(self):
+        """Test that streaming writes the same bytes as a single write."""
+        data = {'a': [1, {'b': ['x', 'ø']}, (2, 3)], 'tree': {'children': [{'n': 1}, []]}, 1: None}
+        one_shot = Path(self.temp_dir) / 'one.json'
+        write_json(one_shot, data)
+
+        for depth in range(1, 5):
+            streamed = Path(self.temp_dir) / f'streamed{depth}.json'
+            write_json(streamed, data, stream_depth=depth)
+            self.assertEqual(streamed.read_bytes(), one_shot.read_bytes(), depth)
+
+    def test_streamed_write_encodes_one_repository_at_a_time(self):
+        """Test that an analysis streamed at depth 3 never encodes the whole tree at once."""
+        from unittest.mock import patch
+        from aina_lib import file_utils
+        path = Path(self.temp_dir) / 'analysis.json'
+        repos = [{'name': f'r{i}', 'children': [{'name': 'a.py', 'value': i}]} for i in range(3)]
+        data = {'stats': {'total_repos': 3}, 'tree': {'name': 's', 'children': repos}}
+        original_encode = file_utils._ENCODER.encode
+        encoded = []
+
+        def encode(value):
+            text = original_encode(value)
+            encoded.append(text)
+            return text
+
+        with patch.object(file_utils._ENCODER, 'encode', side_effect=encode):
+            write_json(path, data, stream_depth=3)
+
+        self.assertEqual(read_json(path), data)
+        self.assertEqual(max(len(text) for text in encoded), len(dump_json_bytes(repos[0])))
+
+    def test_read_fields_stops_before_later_members(self):
+        """Test that members after the last wanted field are never parsed."""
+        path = Path(self.temp_dir) / 'data.json'
+        path.write_text('{"name": "x", "stats": {"files": 2}, "tree": {"broken"')
+
+        fields = read_json_fields(path, ['stats', 'name'])
+
+        self.assertEqual(fields, {'name': 'x', 'stats': {'files': 2}})
+
+    def test_read_fields_omits_missing_keys(self):
+        """Test that absent keys are left out of the result."""
+        path = Path(self.temp_dir) / 'data.json'
+        write_json(path, {'name': 'x', 'tree': []})
+
+        self.assertEqual(read_json_fields(path, ['name', 'stats']), {'name': 'x'})
+
+    def test_read_fields_beyond_first_chunk(self):
+        """Test that fields past the first chunk are found in later chunks."""
+        path = Path(self.temp_dir) / 'data.json'
+        write_json(path, {'tree': ['ø' * 50], 'stats': {'files': 2}})
+
+        fields = read_json_fields(path, ['stats'], chunk_size=16)
+
+        self.assertEqual(fields, {'stats': {'files': 2}})
+
+    def test_read_fields_stops_reading_once_found(self):
+        """Test that the file is not read past the chunk holding the fields."""
+        path = Path(self.temp_dir) / 'data.json'
+        path.write_text('{"tree": ["' + 'x' * 20 + '"], "stats": 2, "rest": ' + '[' * 1000)
+
+        self.assertEqual(read_json_fields(path, ['stats'], chunk_size=16), {'stats': 2})
+
+    def test_read_fields_number_across_chunk_boundary(self):
+        """Test that a number cut off at the end of a chunk is read in full."""
+        path = Path(self.temp_dir) / 'data.json'
+        path.write_text('{"a":123456,"b":[1,2,3]}')
+
+        for chunk_size in range(1, 16):
+            self.assertEqual(read_json_fields(path, ['a'], chunk_size=chunk_size), {'a': 123456}, chunk_size)
+
+    def test_read_fields_rejects_truncated_json(self):
+        """Test that a file ending before the object closes raises ValueError."""
+        path = Path(self.temp_dir) / 'data.json'
+        path.write_text('{"name": "x", ')
+
+        with self.assertRaises(ValueError):
+            read_json_fields(path, ['name', 'stats'])
+
+    def test_read_fields_rejects_invalid_json(self):
+        """Test that a malformed file raises ValueError."""
+        path = Path(self.temp_dir) / 'data.json'
+        path.write_text('{"name" "x"}')
+
+        with self.assertRaises(ValueError):
+            read_json_fields(path, ['name'])
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -189,12 +189,161 @@ class TestGetFileStatsWithFollow(GitRepoTestCase):
 
         stats = get_file_stats(self.repo_path)
 
-        # new_name.py should have all 4 commits (including rename and pre-rename)
-        # The bulk query sees: rename commit + post-rename commit = 2 for new_name
-        # But with --follow it should see all commits
-        self.assertIn('new_name.py', stats)
-        # At minimum, should have the commits after rename
-        self.assertGreaterEqual(stats['new_name.py']['commits_1y'], 2)
+        # All 4 commits, including the 2 made under the old name
+        self.assertEqual(stats['new_name.py']['commits_1y'], 4)
+        self.assertNotIn('old_name.py', stats)
+
+    def test_follow_helper_keeps_author_with_pipe(self):
+        """The per-file --follow variant does not cut author names at '|'."""
+        self.create_file('a.py')
+        self.commit_as('Add a', 'Ola | Nordmann', 'ola@test.com')
+
+        stats = get_file_stats_with_follow(self.repo_path, 'a.py', 0)
+
+        self.assertEqual(stats['commits_1y'], 1)
+        self.assertEqual(stats['commits_3m'], 1)
+        self.assertEqual(stats['contributors_set'], {'Ola | Nordmann'})
+
+    def test_credits_pre_rename_history_from_single_log(self):
+        """Commits made under an old name count for the current name, in one git call."""
+        from unittest.mock import patch
+        from aina_lib import git_stats
+
+        self.create_file('a.py', 'content one')
+        self.commit('Create a')
+        subprocess.run(['git', 'mv', 'a.py', 'b.py'], cwd=self.repo_path, capture_output=True)
+        self.commit('Rename a -> b')
+        subprocess.run(['git', 'mv', 'b.py', 'c.py'], cwd=self.repo_path, capture_output=True)
+        self.commit('Rename b -> c')
+        self.create_file('a.py', 'unrelated new file')
+        self.commit('New a')
+
+        with patch.object(git_stats.subprocess, 'run', wraps=subprocess.run) as run, \
+                patch.object(git_stats.subprocess, 'Popen', wraps=subprocess.Popen) as popen:
+            stats = get_file_stats(self.repo_path)
+
+        self.assertEqual(run.call_count + popen.call_count, 1)
+        self.assertEqual(stats['c.py']['commits_1y'], 3)
+        self.assertEqual(stats['a.py']['commits_1y'], 1)
+        self.assertNotIn('b.py', stats)
+
+    def test_fields_split_across_pipe_reads(self):
+        """Fields that straddle two reads of git's output are joined back together."""
+        from unittest.mock import patch
+        from aina_lib import git_stats
+
+        self.create_file('a.py', 'content one')
+        self.commit_as('Create a', 'Kari Nordmann', 'kari@test.com')
+        subprocess.run(['git', 'mv', 'a.py', 'bb.py'], cwd=self.repo_path, capture_output=True)
+        self.commit('Rename a -> bb')
+        expected = get_file_stats(self.repo_path)
+
+        with patch.object(git_stats, '_PIPE_READ_SIZE', 3):
+            stats = get_file_stats(self.repo_path)
+
+        self.assertEqual(stats, expected)
+        self.assertEqual(stats['bb.py']['commits_1y'], 2)
+
+    def test_paths_with_spaces_and_non_ascii_are_unquoted(self):
+        """File names come through verbatim rather than git-quoted."""
+        self.create_file('my file.py', 'content')
+        self.create_file('blåbær.py', 'content')
+        self.commit('Add files')
+
+        stats = get_file_stats(self.repo_path)
+
+        self.assertEqual(set(stats), {'my file.py', 'blåbær.py'})
+
+    def test_linked_worktree(self):
+        """A worktree, whose .git is a file rather than a directory, is read too."""
+        self.create_file('a.py')
+        self.commit('Add a')
+        worktree = Path(self.temp_dir) / 'wt'
+        subprocess.run(['git', 'worktree', 'add', '-q', str(worktree)],
+                       cwd=self.repo_path, capture_output=True, check=True)
+
+        stats = get_file_stats(str(worktree))
+
+        self.assertEqual(stats['a.py']['commits_1y'], 1)
+
+    def test_author_name_with_pipe(self):
+        """Author names are not cut at separator characters."""
+        self.create_file('a.py')
+        self.commit_as('Add a', 'Ola | Nordmann', 'ola@test.com')
+
+        stats = get_file_stats(self.repo_path)
+
+        self.assertEqual(stats['a.py']['contributors']['names'], ['Ola | Nordmann'])
+
+
+class TestGetFileStatsCached(GitRepoTestCase):
+    """Test get_file_stats_cached against a dict-backed cache."""
+
+    class DictCache:
+        def __init__(self):
+            self.entries = {}
+
+        def get(self, repo_path, head_sha):
+            return self.entries.get((repo_path, head_sha))
+
+        def put(self, repo_path, head_sha, stats):
+            self.entries[(repo_path, head_sha)] = stats
+
+    def test_reuses_stats_until_head_moves(self):
+        """A second call at the same HEAD is served from the cache."""
+        from unittest.mock import patch
+        from aina_lib import git_stats, get_file_stats_cached
+
+        cache = self.DictCache()
+        self.create_file('a.py', 'one')
+        self.commit('first')
+        first = get_file_stats_cached(self.repo_path, cache)
+
+        with patch.object(git_stats, '_file_stats') as uncached:
+            self.assertEqual(get_file_stats_cached(self.repo_path, cache), first)
+        uncached.assert_not_called()
+
+        self.create_file('a.py', 'two')
+        self.commit('second')
+        self.assertEqual(get_file_stats_cached(self.repo_path, cache)['a.py']['commits_1y'], 2)
+        self.assertEqual(len(cache.entries), 2)
+
+    def test_git_failure_is_not_cached(self):
+        """A failed git log gives an empty result once, and is retried on the next call."""
+        from unittest.mock import patch
+        from aina_lib import git_stats, get_file_stats_cached, get_coupling_data_cached
+
+        cache = self.DictCache()
+        self.create_file('a.py', 'one')
+        self.commit('first')
+        failure = subprocess.CalledProcessError(128, ['git', 'log'])
+
+        with patch.object(git_stats, '_file_stats', side_effect=failure), \
+                patch.object(git_stats, '_coupling_data', side_effect=failure):
+            self.assertEqual(get_file_stats_cached(self.repo_path, cache), {})
+            self.assertEqual(get_coupling_data_cached(self.repo_path, cache), {'threshold': 3, 'pairs': []})
+        self.assertEqual(cache.entries, {})
+
+        self.assertEqual(get_file_stats_cached(self.repo_path, cache)['a.py']['commits_1y'], 1)
+        self.assertEqual(get_coupling_data_cached(self.repo_path, cache)['threshold'], 3)
+        self.assertEqual(len(cache.entries), 2)
+
+    def test_coupling_is_cached_apart_from_file_stats(self):
+        """Coupling data shares the cache but not the file stats' entry."""
+        from unittest.mock import patch
+        from aina_lib import git_stats, get_file_stats_cached, get_coupling_data_cached
+
+        cache = self.DictCache()
+        self.create_file('a.py', 'one')
+        self.commit('first')
+        file_stats = get_file_stats_cached(self.repo_path, cache)
+        coupling = get_coupling_data_cached(self.repo_path, cache)
+
+        with patch.object(git_stats, '_coupling_data') as uncached:
+            self.assertEqual(get_coupling_data_cached(self.repo_path, cache), coupling)
+        uncached.assert_not_called()
+        self.assertEqual(len(cache.entries), 2)
+        self.assertEqual(get_file_stats_cached(self.repo_path, cache), file_stats)
 
 
 class TestContributorExtraction(GitRepoTestCase):
@@ -220,6 +369,17 @@ class TestContributorExtraction(GitRepoTestCase):
         self.assertIn('Bob', stats['shared.py']['contributors']['names'])
         self.assertIn('Charlie', stats['shared.py']['contributors']['names'])
 
+    def test_files_share_one_author_string(self):
+        """An author's name is one string object across all files and commits."""
+        self.create_file('a.py', 'v1')
+        self.commit_as('Add a', 'Kari Nordmann', 'kari@example.com')
+        self.create_file('b.py', 'v1')
+        self.commit_as('Add b', 'Kari Nordmann', 'kari@example.com')
+
+        stats = get_file_stats(self.repo_path)
+
+        self.assertIs(stats['a.py']['contributors']['names'][0], stats['b.py']['contributors']['names'][0])
+
     def test_counts_unique_contributors_not_commits(self):
         """Same author with multiple commits counted once."""
         self.create_file('test.py', 'v1')
@@ -480,6 +640,82 @@ class TestAnalyzeReposWithGitStats(GitRepoTestCase):
         self.assertEqual(len(result), 3)
         self.assertEqual(result, (None, None, None))
 
+    def test_analyze_single_repo_does_not_wait_for_git_when_no_files(self):
+        """Without countable files the result comes back while git is still running."""
+        import threading
+        from unittest.mock import patch
+        from aina_lib import analysis
+
+        release = threading.Event()
+
+        def slow_git_pass(*args, **kwargs):
+            release.wait(10)
+            return {}
+
+        try:
+            with patch.object(analysis, 'run_cloc', return_value={'header': {}}), \
+                    patch.object(analysis, 'get_file_stats', side_effect=slow_git_pass):
+                result = analysis.analyze_single_repo(self.repo_path, Path(self.repo_path))
+
+                self.assertFalse(release.is_set())
+                self.assertEqual(result, (None, None, None))
+        finally:
+            release.set()
+
+    def test_analyze_single_repo_skips_repo_when_cloc_fails(self):
+        """A cloc failure leaves the repo out; programming errors are not hidden."""
+        from unittest.mock import patch
+        from aina_lib import analysis
+
+        with patch.object(analysis, 'run_cloc', side_effect=RuntimeError('cloc produced no output')):
+            result = analysis.analyze_single_repo(self.repo_path, Path(self.repo_path))
+        self.assertEqual(result, (None, None, None))
+
+        with patch.object(analysis, 'run_cloc', side_effect=KeyError('code')):
+            with self.assertRaises(KeyError):
+                analysis.analyze_single_repo(self.repo_path, Path(self.repo_path))
+
+    def test_analyze_single_repo_skips_repo_when_stats_cache_fails(self):
+        """A database error in the stats cache leaves the repo out instead of aborting."""
+        import sqlite3
+        from unittest.mock import MagicMock
+        from aina_lib import analysis
+
+        self.create_file('a.py', 'print(1)\n')
+        self.commit('Add a')
+        cache = MagicMock()
+        cache.get.side_effect = sqlite3.OperationalError('database is locked')
+
+        result = analysis.analyze_single_repo(self.repo_path, Path(self.repo_path), stats_cache=cache)
+
+        self.assertEqual(result, (None, None, None))
+
+    def test_repos_keep_discovery_order_when_analyzed_in_parallel(self):
+        """Repository nodes come out in discovery order regardless of completion order."""
+        from unittest.mock import patch
+        from aina_lib import analysis
+
+        import shutil
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+
+        names = ['delta', 'alpha', 'charlie', 'bravo']
+        for name in names:
+            repo = Path(root) / name
+            repo.mkdir()
+            (repo / '.git').mkdir()
+
+        def fake_cloc(repo_path, on_progress=None):
+            return {str(Path(repo_path) / 'main.py'): {'code': 1, 'language': 'Python'}}
+
+        with patch.object(analysis, 'run_cloc', side_effect=fake_cloc), \
+                patch.object(analysis, 'check_staleness', return_value=[]):
+            result = analysis.analyze_repos('test', root, on_progress=lambda msg: None)
+
+        repo_names = [child['name'] for child in result['tree']['children']]
+        self.assertEqual(repo_names, sorted(names))
+        self.assertEqual(result['stats']['total_files'], 4)
+
 
 
 class TestGetCouplingData(GitRepoTestCase):
@@ -572,6 +808,21 @@ class TestGetCouplingData(GitRepoTestCase):
         self.assertEqual(len(result['pairs']), 1)
         self.assertEqual(set(result['pairs'][0]['files']), {'real_a.py', 'real_b.py'})
 
+    def test_renamed_files_count_under_new_name(self):
+        """A rename counts as a change to the new path."""
+        for i in range(2):
+            self.create_file('old.py', f'v{i}')
+            self.create_file('other.py', f'v{i}')
+            self.commit(f'Update {i}')
+        subprocess.run(['git', 'mv', 'old.py', 'new.py'], cwd=self.repo_path, capture_output=True)
+        self.create_file('other.py', 'v2')
+        self.commit('Rename')
+
+        result = get_coupling_data(self.repo_path, threshold=1)
+
+        self.assertIn({'files': ['new.py', 'other.py'], 'count': 1}, result['pairs'])
+        self.assertIn({'files': ['old.py', 'other.py'], 'count': 2}, result['pairs'])
+
     def test_handles_nested_paths(self):
         """Files in subdirectories have correct paths."""
         for i in range(3):
@@ -585,6 +836,28 @@ class TestGetCouplingData(GitRepoTestCase):
         self.assertIn('src/main/app.py', result['pairs'][0]['files'])
         self.assertIn('tests/test_app.py', result['pairs'][0]['files'])
 
+    def test_paths_with_spaces_and_non_ascii_are_unquoted(self):
+        """Coupled paths come through verbatim, matching the file stats paths."""
+        for i in range(3):
+            self.create_file('my file.py', f'v{i}')
+            self.create_file('blåbær.py', f'v{i}')
+            self.commit(f'Update {i}')
+
+        result = get_coupling_data(self.repo_path, threshold=3)
+
+        self.assertEqual(result['pairs'], [{'files': ['blåbær.py', 'my file.py'], 'count': 3}])
+
+    def test_file_named_like_a_header_is_a_path(self):
+        """A file whose name matches the log's commit marker is still a file."""
+        for i in range(3):
+            self.create_file('COMMIT', f'v{i}')
+            self.create_file('x.py', f'v{i}')
+            self.commit(f'Update {i}')
+
+        result = get_coupling_data(self.repo_path, threshold=3)
+
+        self.assertEqual(result['pairs'], [{'files': ['COMMIT', 'x.py'], 'count': 3}])
+
 
 class TestAnalyzeReposWithCoupling(GitRepoTestCase):
     """Test that analyze_repos includes coupling data."""
@@ -646,6 +919,17 @@ class TestGetRepoStalenessInfo(GitRepoTestCase):
         # Default branch after git init is usually 'master' or 'main'
         self.assertIn(info['branch'], ['master', 'main'])
 
+    def test_returns_non_ascii_branch_name(self):
+        """Branch names are decoded as UTF-8 whatever the locale."""
+        self.create_file('test.py', 'content')
+        self.commit('Initial')
+        subprocess.run(['git', 'checkout', '-b', 'fix/blåbær'], cwd=self.repo_path,
+                       capture_output=True, check=True)
+
+        info = get_repo_staleness_info(self.repo_path)
+
+        self.assertEqual(info['branch'], 'fix/blåbær')
+
     def test_returns_last_commit_date(self):
         """Returns last commit date in ISO format."""
         self.create_file('test.py', 'content')
@@ -666,6 +950,18 @@ class TestGetRepoStalenessInfo(GitRepoTestCase):
         self.assertIsNotNone(info['last_commit_age_days'])
         self.assertEqual(info['last_commit_age_days'], 0)  # Just committed
 
+    def test_commit_age_is_measured_from_given_now(self):
+        """Age counts whole days between the commit instant and now, across time zones."""
+        from datetime import datetime
+        self.create_file('test.py', 'content')
+        self.commit_with_date('Initial', '2025-03-01T23:30:00+02:00')
+        commit_time = datetime.fromisoformat('2025-03-01T23:30:00+02:00').timestamp()
+
+        info = get_repo_staleness_info(self.repo_path, now=commit_time + 10 * 86400 - 1)
+
+        self.assertEqual(info['last_commit_date'], '2025-03-01T23:30:00+02:00')
+        self.assertEqual(info['last_commit_age_days'], 9)
+
     def test_returns_no_remote_status_when_no_remote(self):
         """Returns no_remote status when repo has no remote."""
         self.create_file('test.py', 'content')
@@ -684,6 +980,87 @@ class TestGetRepoStalenessInfo(GitRepoTestCase):
         self.assertIsNone(info['last_commit_age_days'])
 
 
+    def test_reads_branches_from_clone_of_remote(self):
+        """Reports branch, default branch and behind status for a clone."""
+        self.create_file('test.py', 'content')
+        self.commit('Initial')
+        branch = subprocess.run(
+            ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
+            cwd=self.repo_path, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        clone_path = os.path.join(self.temp_dir, 'clone')
+        subprocess.run(['git', 'clone', '-q', self.repo_path, clone_path], capture_output=True, check=True)
+        self.create_file('test.py', 'changed')
+        self.commit('Upstream change', files=['test.py'])
+
+        info = get_repo_staleness_info(clone_path)
+
+        self.assertEqual(info['branch'], branch)
+        self.assertEqual(info['default_branch'], branch)
+        self.assertEqual(info['remote_status'], 'behind')
+        self.assertEqual(info['commits_behind'], 0)  # dry-run leaves origin refs as they were
+
+        subprocess.run(['git', 'checkout', '-q', '--detach'], cwd=clone_path, capture_output=True, check=True)
+        self.assertEqual(get_repo_staleness_info(clone_path)['branch'], 'HEAD')
+
+    def test_reuses_recent_remote_check_until_origin_refs_move(self):
+        """A cached remote check is used within the TTL while origin refs are unchanged."""
+        from unittest.mock import patch
+        from aina_lib import git_staleness
+
+        self.create_file('test.py', 'content')
+        self.commit('Initial')
+        clone_path = os.path.join(self.temp_dir, 'clone')
+        subprocess.run(['git', 'clone', '-q', self.repo_path, clone_path], capture_output=True, check=True)
+        self.create_file('test.py', 'changed')
+        self.commit('Upstream change', files=['test.py'])
+        home = Path(self.temp_dir) / 'home'
+
+        with patch.object(git_staleness.Path, 'home', return_value=home):
+            first = get_repo_staleness_info(clone_path, fetch_cache_ttl=3600)
+            with patch.object(git_staleness, '_dry_run_fetch') as fetch:
+                again = get_repo_staleness_info(clone_path, fetch_cache_ttl=3600)
+            fetch.assert_not_called()
+
+            subprocess.run(['git', 'fetch', '-q'], cwd=clone_path, capture_output=True, check=True)
+            after_fetch = get_repo_staleness_info(clone_path, fetch_cache_ttl=3600)
+
+        self.assertEqual(first['remote_status'], 'behind')
+        self.assertEqual(again, first)
+        self.assertEqual(after_fetch['remote_status'], 'up_to_date')
+
+    def test_fetch_timeout_is_reported_as_fetch_failed(self):
+        """A remote that does not answer in time is a fetch failure, not an exception."""
+        from unittest.mock import patch
+        from aina_lib import git_staleness
+
+        self.create_file('test.py', 'content')
+        self.commit('Initial')
+        subprocess.run(['git', 'remote', 'add', 'origin', 'https://example.invalid/r.git'],
+                       cwd=self.repo_path, capture_output=True, check=True)
+        real_run = subprocess.run
+
+        def run(args, **kwargs):
+            if args[:2] == ['git', 'fetch']:
+                raise subprocess.TimeoutExpired(args, kwargs.get('timeout'))
+            return real_run(args, **kwargs)
+
+        home = Path(self.temp_dir) / 'home'
+
+        with patch.object(git_staleness.Path, 'home', return_value=home), \
+                patch.object(git_staleness.subprocess, 'run', side_effect=run):
+            info = get_repo_staleness_info(self.repo_path, fetch_cache_ttl=3600)
+            # The failure is not cached: the next call asks the remote again
+            with patch.object(git_staleness, '_dry_run_fetch',
+                              return_value={'failed': False, 'error': None, 'updates': False}) as fetch:
+                retried = get_repo_staleness_info(self.repo_path, fetch_cache_ttl=3600)
+
+        self.assertEqual(info['remote_status'], 'fetch_failed')
+        self.assertIn('timed out', info['error'])
+        fetch.assert_called_once()
+        self.assertEqual(retried['remote_status'], 'up_to_date')
+
+
 class TestFormatStalenessWarning(unittest.TestCase):
     """Test format_staleness_warning function."""
 
@@ -1028,5 +1405,32 @@ class TestResolveRenamePath(unittest.TestCase):
         self.assertEqual(_resolve_rename_path('src/{ => sub}/file.js'), 'src/sub/file.js')
 
 
+class TestIsoTimestamp(unittest.TestCase):
+    """Test the fast git date parser against datetime.fromisoformat."""
+
+    def test_matches_datetime(self):
+        from aina_lib.git_stats import _iso_timestamp
+        for value in ['2025-11-15T14:32:00+01:00', '2025-11-15T14:32:00-05:30',
+                      '2024-02-29T00:00:00+00:00', '2025-11-15T14:32:00Z',
+                      '2025-11-15T14:32:00.5+01:00']:
+            expected = datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+            self.assertEqual(_iso_timestamp(value.encode()), expected, value)
+
+    def test_rejects_non_dates(self):
+        from aina_lib.git_stats import _iso_timestamp
+        for value in [b'', b'not a date', b'2025-11-15Tab:cd:ef+01:00']:
+            with self.assertRaises(ValueError):
+                _iso_timestamp(value)
+
+    def test_repeated_dates_are_cached(self):
+        from aina_lib.git_stats import _iso_timestamp
+        value = b'2001-02-03T04:05:06+07:00'
+        first = _iso_timestamp(value)
+        hits = _iso_timestamp.cache_info().hits
+
+        self.assertEqual(_iso_timestamp(value), first)
+        self.assertEqual(_iso_timestamp.cache_info().hits, hits + 1)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -66,6 +66,22 @@ class TestDiscoverRepos(unittest.TestCase):
         self.assertIn(str(parent), repos)
         self.assertNotIn(str(child), repos)
 
+    def test_discover_many_subdirectories(self):
+        """Test the parallel probe of many subdirectories finds exactly the repos."""
+        expected = []
+        for i in range(40):
+            subdir = Path(self.temp_dir) / f'dir{i:02}'
+            subdir.mkdir()
+            if i % 3 == 0:
+                (subdir / '.git').mkdir()
+                expected.append(str(subdir))
+            elif i % 3 == 1:
+                (subdir / '.git').write_text('gitdir: elsewhere')
+
+        repos = discover_repos(self.temp_dir)
+
+        self.assertEqual(repos, expected)
+
     def test_discover_no_repos(self):
         """Test discovering in directory with no repositories."""
         # Create some directories but no .git